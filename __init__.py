@@ -15,12 +15,16 @@ from bpy.props import PointerProperty
 from bpy.types import Scene
 
 from . import utils
+from . import evaluation
+from . import profiler
 from . import properties
 from . import operators
 from . import panels
 
 modules = (
     utils,
+    evaluation,
+    profiler,
     properties,
     operators,
     panels,
@@ -0,0 +1,259 @@
+"""
+Headless benchmark suite for the LVCP add-on.
+
+Builds a synthetic scene with N armatures (named to match the default Auto-Setup
+profile), M lights per light group and K linked meshes per character, then times
+instance setup, linking, light group updates, per-frame evaluation in every
+evaluation mode and the helpers used by the panels. Results are written as JSON.
+
+    blender -b --factory-startup --python benchmarks/run_benchmarks.py -- --armatures 20 --lights 4 --meshes 3 --frames 100 --output lvcp_bench.json
+
+It can also be run with the 'bpy' module: python benchmarks/run_benchmarks.py --armatures 20
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+
+import bpy
+
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EVAL_MODES = ('DRIVER', 'SIMPLE', 'HANDLER')
+
+
+# region Add-on
+
+
+def load_addon():
+    """Imports (and registers, if needed) the add-on this script ships with."""
+    name = os.path.basename(ADDON_DIR)
+    if name not in sys.modules:
+        sys.path.insert(0, os.path.dirname(ADDON_DIR))
+    addon = importlib.import_module(name)
+    if not hasattr(bpy.types.Scene, "LVCP"):
+        addon.register()
+    return addon
+
+
+class _SilentReporter:
+    def report(self, type, message):
+        pass
+
+
+# region Timing
+
+
+class Timings:
+    """Collects samples per benchmark name and summarises them."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[name] = {
+                "count": len(samples),
+                "total": sum(samples),
+                "mean": statistics.fmean(samples),
+                "median": statistics.median(samples),
+                "min": ordered[0],
+                "max": ordered[-1],
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            }
+        return result
+
+
+# region Scene
+
+
+def _letters(index):
+    """0 -> 'A', 25 -> 'Z', 26 -> 'BA': armature base names may only contain letters."""
+    digits = ""
+    while True:
+        index, rest = divmod(index, 26)
+        digits = chr(ord('A') + rest) + digits
+        if not index:
+            return digits
+
+
+def reset_scene(scene):
+    lvcp = scene.LVCP
+    lvcp.eval_mode = 'DRIVER'
+    lvcp.lists.clear()
+    lvcp.idx = 0
+    lvcp.lvcp_collection = None
+    lvcp.light_collection = None
+    ids = list(bpy.data.objects) + list(bpy.data.collections) + list(bpy.data.meshes)
+    ids += list(bpy.data.armatures) + list(bpy.data.actions)
+    bpy.data.batch_remove(ids)
+
+
+def build_scene(context, armatures, meshes, frames):
+    """Creates animated armatures with a Head_M bone and their child meshes."""
+    scene = context.scene
+    mesh_names = ("Body", "Face", "Hair")
+    for a in range(armatures):
+        name = f"Art_Bench{_letters(a)}"
+        arm = bpy.data.objects.new(name, bpy.data.armatures.new(name))
+        scene.collection.objects.link(arm)
+        arm.location.x = a * 2.0
+
+        context.view_layer.objects.active = arm
+        bpy.ops.object.mode_set(mode='EDIT')
+        bone = arm.data.edit_bones.new("Head_M")
+        bone.head = (0.0, 0.0, 1.6)
+        bone.tail = (0.0, 0.0, 1.8)
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+        # Give the evaluation something to do on every frame
+        arm.rotation_euler.z = 0.0
+        arm.keyframe_insert("rotation_euler", index=2, frame=1)
+        arm.rotation_euler.z = 3.14159
+        arm.keyframe_insert("rotation_euler", index=2, frame=frames)
+
+        for k in range(meshes):
+            mesh = bpy.data.meshes.new(mesh_names[k % len(mesh_names)])
+            mesh.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [], [(0, 1, 2)])
+            obj = bpy.data.objects.new(mesh_names[k % len(mesh_names)], mesh)
+            scene.collection.objects.link(obj)
+            obj.parent = arm
+    context.view_layer.update()
+
+
+def _select_only(context, objects):
+    for obj in context.view_layer.objects:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    if objects:
+        context.view_layer.objects.active = objects[0]
+
+
+# region Benchmarks
+
+
+def bench_setup(context, operators, utils, timings):
+    utils.ensure_initial_collections()
+    for candidate in utils.armature_index.candidates(context.scene):
+        timings.measure(
+            "setup_new_lvcp_instance", operators._setup_new_lvcp_instance,
+            _SilentReporter(), context, candidate.base_name, candidate.base_name, True,
+            candidate.profile.head_bone, armature_obj=candidate.armature,
+        )
+
+
+def bench_add_lights(context, utils, lights, timings):
+    lvcp = utils.get_LVCP()
+    for i in range(len(lvcp.lists)):
+        lvcp.idx = i
+        for _ in range(lights - 1):
+            timings.measure("add_light_empty", bpy.ops.lvcp.add_light_empty)
+
+
+def bench_link(context, utils, timings):
+    lvcp = utils.get_LVCP()
+    for i, item in enumerate(lvcp.lists):
+        lvcp.idx = i
+        head = item.collection.get(utils.Constants.COLLECTION_PROP_O)
+        armature = head.constraints[0].target if head and head.constraints else None
+        meshes = [child for child in armature.children if child.type == 'MESH'] if armature else []
+        _select_only(context, meshes)
+        timings.measure("link_objects", bpy.ops.lvcp.link_objects)
+
+
+def bench_update_light_group(context, utils, timings, repeat=5):
+    for item in utils.get_LVCP().lists:
+        for _ in range(repeat):
+            timings.measure("update_light_group", item.update_light_group, context)
+
+
+def bench_frames(context, utils, frames, timings):
+    scene = context.scene
+    lvcp = utils.get_LVCP()
+    for mode in EVAL_MODES:
+        timings.measure(f"switch_eval_mode[{mode}]", setattr, lvcp, "eval_mode", mode)
+        for frame in range(1, frames + 1):
+            timings.measure(f"frame_set[{mode}]", scene.frame_set, frame)
+    lvcp.eval_mode = 'DRIVER'
+
+
+def bench_panel_helpers(context, utils, timings, repeat=20):
+    lvcp = utils.get_LVCP()
+    for _ in range(repeat):
+        utils.linked_index.invalidate()
+        utils.armature_index.invalidate()
+        timings.measure("find_suitable_armatures[cold]", utils.find_suitable_armatures, context)
+        timings.measure("find_suitable_armatures[warm]", utils.find_suitable_armatures, context)
+        timings.measure("get_instances_by_collection_name", utils.get_instances_by_collection_name, lvcp)
+        for item in lvcp.lists:
+            timings.measure("count_objects_with_lvcp", utils.count_objects_with_lvcp, item)
+            timings.measure("get_objects_with_lvcp", utils.get_objects_with_lvcp, item)
+
+
+# region Main
+
+
+def parse_args(argv):
+    argv = argv[argv.index("--") + 1:] if "--" in argv else argv[1:]
+    parser = argparse.ArgumentParser(description="LVCP headless benchmarks")
+    parser.add_argument("--armatures", type=int, default=10, help="Number of characters (N)")
+    parser.add_argument("--lights", type=int, default=4, help="Lights per light group (M)")
+    parser.add_argument("--meshes", type=int, default=3, help="Linked meshes per character (K)")
+    parser.add_argument("--frames", type=int, default=50, help="Frames evaluated per evaluation mode")
+    parser.add_argument("--output", default="", help="JSON output file (stdout if empty)")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    addon = load_addon()
+    utils, operators = addon.utils, addon.operators
+    context = bpy.context
+
+    reset_scene(context.scene)
+    build_scene(context, args.armatures, args.meshes, args.frames)
+
+    timings = Timings()
+    total = time.perf_counter()
+    bench_setup(context, operators, utils, timings)
+    bench_add_lights(context, utils, args.lights, timings)
+    bench_link(context, utils, timings)
+    bench_update_light_group(context, utils, timings)
+    bench_frames(context, utils, args.frames, timings)
+    bench_panel_helpers(context, utils, timings)
+
+    return {
+        "addon_version": list(addon.bl_info["version"]),
+        "blender_version": bpy.app.version_string,
+        "parameters": vars(args),
+        "total_seconds": time.perf_counter() - total,
+        "results": timings.summary(),
+    }
+
+
+def main():
+    args = parse_args(sys.argv)
+    report = run(args)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"LVCP benchmark written to '{args.output}'.")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,895 @@
+# Driver-free batched evaluation of light and head vectors
+
+import bpy
+import json
+import os
+import numpy as np
+from bpy.app.handlers import persistent
+from . import utils
+from . import profiler
+
+
+# region Gather
+
+
+_is_evaluating = False
+
+
+@profiler.profiled("evaluation.collect_targets")
+def collect_targets(lvcp, all_lights=True):
+    """
+    Collects every object the evaluation touches across all LVCP instances.
+    Returns (heads, masters, lights, selected) where 'selected' holds, per master,
+    the index into 'lights' of the currently selected light or -1.
+    With all_lights=False only the selected light of each group is collected, so the
+    cost per group stays constant no matter how many lights it has.
+    """
+    heads, masters, lights, selected = [], [], [], []
+    light_slots = {}
+
+    def slot(obj):
+        key = obj.as_pointer()
+        if key not in light_slots:
+            light_slots[key] = len(lights)
+            lights.append(obj)
+        return light_slots[key]
+
+    for item in lvcp.lists:
+        # Baked instances are played back from their F-curves
+        if not item.collection or item.is_baked:
+            continue
+        head = item.collection.get(utils.Constants.COLLECTION_PROP_O)
+        if head:
+            heads.append(head)
+
+        group_objects = item.light_group.objects if item.light_group else []
+        if all_lights:
+            for obj in group_objects:
+                slot(obj)
+
+        master = item.light_master
+        if master:
+            idx = master.get("idx", 0)
+            masters.append(master)
+            if 0 <= idx < len(group_objects):
+                selected.append(slot(group_objects[idx]))
+            else:
+                selected.append(-1)
+    return heads, masters, lights, selected
+
+
+@profiler.profiled("evaluation.read_matrices")
+def read_matrices(objects):
+    """Reads the world matrices of 'objects' into an (n, 4, 4) array (row-major, like mathutils)."""
+    if not objects:
+        return np.zeros((0, 4, 4), dtype=np.float32)
+    return np.array([obj.matrix_world for obj in objects], dtype=np.float32)
+
+
+# region Compute
+
+
+def head_vectors(matrices):
+    """Front (-Y axis) and up (Z axis) vectors, matching the 'matrix_world[1]'/'[2]' drivers."""
+    return -matrices[:, :3, 1], matrices[:, :3, 2]
+
+
+def light_vectors(matrices):
+    """Light direction (Z axis) vectors, matching the 'matrix_world[2]' driver."""
+    return matrices[:, :3, 2]
+
+
+def select_light_vectors(lights, selected):
+    """Picks the selected light vector for every master. Out of range selections yield zero vectors."""
+    selected = np.asarray(selected, dtype=np.intp)
+    result = np.zeros((len(selected), 3), dtype=np.float32)
+    valid = selected >= 0
+    if lights.size and valid.any():
+        result[valid] = lights[selected[valid]]
+    return result
+
+
+# region Write
+
+
+def _read_vector(obj, prop_name):
+    value = obj.get(prop_name)
+    try:
+        if value is not None and len(value) == 3:
+            return tuple(value)
+    except TypeError:
+        pass
+    return (np.nan, np.nan, np.nan)
+
+
+@profiler.profiled("evaluation.write_vectors")
+def write_vectors(objects, prop_name, values, tolerance=1e-6):
+    """
+    Writes one row of 'values' to 'prop_name' on each object, skipping objects
+    whose stored value is already within 'tolerance'. Returns the changed objects.
+    """
+    if not objects:
+        return []
+    current = np.array([_read_vector(obj, prop_name) for obj in objects], dtype=np.float32)
+    dirty = np.flatnonzero(~np.all(np.abs(current - values) <= tolerance, axis=1)).tolist()
+    for i in dirty:
+        objects[i][prop_name] = values[i].tolist()
+    return [objects[i] for i in dirty]
+
+
+# region Evaluate
+
+
+@profiler.profiled("evaluation.evaluate_scene")
+def evaluate_scene(scene, all_lights=True):
+    """
+    Evaluates every LVCP instance of 'scene' in one batched pass: reads all world
+    matrices at once, computes the vectors with NumPy and writes back only the
+    values that changed. Returns the number of objects that were updated.
+    Frame changes pass all_lights=False and only evaluate the selected light per group.
+    """
+    global _is_evaluating
+    if _is_evaluating:
+        return 0
+
+    _is_evaluating = True
+    try:
+        heads, masters, lights, selected = collect_targets(scene.LVCP, all_lights)
+        if not heads and not lights:
+            return 0
+
+        matrices = read_matrices(heads + lights)
+        front, up = head_vectors(matrices[:len(heads)])
+        light_vecs = light_vectors(matrices[len(heads):])
+        master_vecs = select_light_vectors(light_vecs, selected)
+
+        light_targets = [i for i, obj in enumerate(lights) if utils.Constants.OBJECT_PROP_LIGHT in obj]
+
+        changed = set()
+        changed.update(write_vectors(heads, utils.Constants.OBJECT_PROP_FRONT, front))
+        changed.update(write_vectors(heads, utils.Constants.OBJECT_PROP_UP, up))
+        changed.update(write_vectors([lights[i] for i in light_targets], utils.Constants.OBJECT_PROP_LIGHT, light_vecs[light_targets]))
+        changed.update(write_vectors(masters, utils.Constants.OBJECT_PROP_LIGHT, master_vecs))
+
+        # Tag once per object so the depsgraph copies (and shaders) pick up the new values
+        for obj in changed:
+            obj.update_tag()
+        write_global_light(scene)
+        return len(changed)
+    finally:
+        _is_evaluating = False
+
+
+def write_global_light(scene):
+    """Copies the global light instance's vector to the scene attribute. Driver modes use a driver instead."""
+    lvcp = scene.LVCP
+    item = lvcp.global_light_instance() if lvcp.global_light else None
+    if item is None or not item.light_master:
+        return False
+    value = item.light_master.get(utils.Constants.OBJECT_PROP_LIGHT)
+    current = scene.get(utils.Constants.SCENE_PROP_LIGHT)
+    if value is None or (current is not None and all(abs(a - b) <= 1e-6 for a, b in zip(current, value))):
+        return False
+    scene[utils.Constants.SCENE_PROP_LIGHT] = list(value)
+    scene.update_tag()
+    return True
+
+
+# region Flat Vectors
+
+
+FLAT_PROPS = (
+    utils.Constants.OBJECT_PROP_FLAT_LIGHT,
+    utils.Constants.OBJECT_PROP_FLAT_FRONT,
+    utils.Constants.OBJECT_PROP_FLAT_UP,
+)
+
+
+# collection pointer -> (vectors, linked object pointers) last written per instance
+_flat_written = {}
+
+
+def _final_vectors(item, global_light):
+    """An instance's light, front and up vectors as lists, zero where missing."""
+    head = item.collection.get(utils.Constants.COLLECTION_PROP_O)
+    if global_light is not None and not item.light_override:
+        light = global_light
+    else:
+        light = _read_vector(item.light_master, utils.Constants.OBJECT_PROP_LIGHT) if item.light_master else (0.0, 0.0, 0.0)
+    vectors = (
+        light,
+        _read_vector(head, utils.Constants.OBJECT_PROP_FRONT) if head else (0.0, 0.0, 0.0),
+        _read_vector(head, utils.Constants.OBJECT_PROP_UP) if head else (0.0, 0.0, 0.0),
+    )
+    return np.nan_to_num(np.array(vectors, dtype=np.float32)).tolist()
+
+
+@profiler.profiled("evaluation.propagate_flat_vectors")
+def propagate_flat_vectors(scene, items=None):
+    """
+    Copies the final light, front and up vectors of 'items' (default: every instance) onto their
+    linked objects, so shaders read '["lvcp_vecLight"]' instead of following the LVCP pointers.
+    The vectors are read once per instance; instances whose vectors and linked objects did not change
+    since the last pass are skipped without touching their objects. Instances following the global
+    light get the global light. Returns the number of changed objects.
+    """
+    lvcp = scene.LVCP
+    global_item = lvcp.global_light_instance() if lvcp.global_light else None
+    global_light = _read_vector(global_item.light_master, utils.Constants.OBJECT_PROP_LIGHT) if global_item and global_item.light_master else None
+
+    changed = 0
+    for item in lvcp.lists if items is None else items:
+        if not item.collection:
+            continue
+        key = item.collection.as_pointer()
+        linked = utils.get_objects_with_lvcp(item)
+        if not linked:
+            _flat_written.pop(key, None)
+            continue
+        vectors = _final_vectors(item, global_light)
+        state = (vectors, tuple(obj.as_pointer() for obj in linked))
+        if _flat_written.get(key) == state:
+            continue
+        _flat_written[key] = state
+        for obj in linked:
+            for prop_name, value in zip(FLAT_PROPS, vectors):
+                obj[prop_name] = value
+            # An object-level tag is enough for the new property values, the meshes are not re-evaluated
+            obj.update_tag(refresh={'OBJECT'})
+        changed += len(linked)
+    return changed
+
+
+def touched_instances(scene, depsgraph):
+    """Instances whose final vectors or linked objects may have changed in a depsgraph update."""
+    updated, owners = set(), set()
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            obj = update.id.original
+            updated.add(obj.as_pointer())
+            collection = obj.get(utils.Constants.OBJECT_PROP_COL)
+            if collection is not None:
+                owners.add(collection.as_pointer())
+    if not updated:
+        return []
+
+    lvcp = scene.LVCP
+    global_item = lvcp.global_light_instance() if lvcp.global_light else None
+    if global_item and global_item.light_master and global_item.light_master.as_pointer() in updated:
+        return list(lvcp.lists)
+    items = []
+    for item in lvcp.lists:
+        if not item.collection:
+            continue
+        head = item.collection.get(utils.Constants.COLLECTION_PROP_O)
+        if item.collection.as_pointer() in owners or any(obj is not None and obj.as_pointer() in updated for obj in (item.light_master, head)):
+            items.append(item)
+    return items
+
+
+def clear_flat_vectors(scene):
+    _flat_written.clear()
+    for item in scene.LVCP.lists:
+        for obj in utils.get_objects_with_lvcp(item) if item.collection else []:
+            for prop_name in FLAT_PROPS:
+                if prop_name in obj:
+                    del obj[prop_name]
+
+
+def is_flat_mode(scene):
+    lvcp = getattr(scene, "LVCP", None)
+    return lvcp is not None and lvcp.flatten_vectors
+
+
+# region Crowd
+
+
+class CrowdIndex:
+    """
+    The collection-instance empties of the crowd collection, rescanned only after structural updates,
+    and the vectors last written to each of them, so unchanged instancers are not read or written.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._objects = []
+        self._rows = {}         # object pointer -> row
+        self.written = np.zeros((0, 3, 3), dtype=np.float32)
+
+    def invalidate(self):
+        self._key = None
+
+    def instancers(self, scene, collection):
+        key = (scene.as_pointer(), collection.as_pointer())
+        if self._key != key:
+            self._objects = [
+                obj for obj in scene.objects
+                if obj.instance_type == 'COLLECTION' and obj.instance_collection == collection
+            ]
+            self._rows = {obj.as_pointer(): i for i, obj in enumerate(self._objects)}
+            self.written = np.full((len(self._objects), 3, 3), np.nan, dtype=np.float32)
+            self._key = key
+        return self._objects
+
+    def rows(self, pointers):
+        return [self._rows[p] for p in pointers if p in self._rows]
+
+    def is_stale(self, depsgraph, collection):
+        """Whether an updated object started or stopped instancing 'collection'."""
+        for update in depsgraph.updates:
+            if isinstance(update.id, bpy.types.Object):
+                obj = update.id.original
+                instancing = obj.instance_type == 'COLLECTION' and obj.instance_collection == collection
+                if instancing != (obj.as_pointer() in self._rows):
+                    return True
+        return False
+
+    def cached_count(self, scene, collection):
+        """Number of instancers if they are indexed for 'collection', without scanning; None otherwise."""
+        return len(self._objects) if self._key == (scene.as_pointer(), collection.as_pointer()) else None
+
+
+crowd_index = CrowdIndex()
+
+
+def crowd_head_matrix(item, collection):
+    """The source character's head origin relative to the crowd collection's instance offset."""
+    head = item.collection.get(utils.Constants.COLLECTION_PROP_O) if item.collection else None
+    if head is None:
+        return None
+    local = np.array(head.matrix_world, dtype=np.float32)
+    local[:3, 3] -= np.array(collection.instance_offset, dtype=np.float32)
+    return local
+
+
+def _crowd_sources(lvcp, item):
+    """Objects whose update changes every crowd instance: the source head and the light it uses."""
+    global_item = lvcp.global_light_instance() if lvcp.global_light else None
+    light_item = global_item if global_item and not item.light_override else item
+    head = item.collection.get(utils.Constants.COLLECTION_PROP_O) if item.collection else None
+    return head, light_item
+
+
+@profiler.profiled("evaluation.evaluate_crowd")
+def evaluate_crowd(scene, updated=None):
+    """
+    Computes the head vectors of the crowd instances in one vectorised pass from the
+    instancers' transforms and the source character's head, and writes them with the
+    shared light onto the instancers, where shaders read them as Instancer attributes.
+    'updated' (object pointers) limits the pass to those instancers unless the source head or
+    light master was updated too. Only instancers whose vectors changed are written.
+    Returns the number of changed instancers.
+    """
+    lvcp = scene.LVCP
+    collection = lvcp.crowd_collection
+    item = lvcp.lists.get(lvcp.crowd_source) if lvcp.crowd_source else None
+    if collection is None or item is None:
+        return 0
+    instancers = crowd_index.instancers(scene, collection)
+    head, light_item = _crowd_sources(lvcp, item)
+    if not instancers or head is None:
+        return 0
+
+    rows = list(range(len(instancers)))
+    sources = (head, light_item.light_master)
+    if updated is not None and not any(obj is not None and obj.as_pointer() in updated for obj in sources):
+        rows = crowd_index.rows(updated)
+        if not rows:
+            return 0
+        instancers = [instancers[i] for i in rows]
+
+    try:
+        matrices = read_matrices(instancers) @ crowd_head_matrix(item, collection)
+    except ReferenceError:
+        # An instancer was removed before the index noticed
+        crowd_index.invalidate()
+        return 0
+    front, up = head_vectors(matrices)
+    # Instances may be scaled, the vectors are directions
+    front = front / np.maximum(np.linalg.norm(front, axis=1, keepdims=True), 1e-8)
+    up = up / np.maximum(np.linalg.norm(up, axis=1, keepdims=True), 1e-8)
+    light = _read_vector(light_item.light_master, utils.Constants.OBJECT_PROP_LIGHT) if light_item.light_master else (0.0, 0.0, 0.0)
+    lights = np.nan_to_num(np.tile(np.array(light, dtype=np.float32), (len(instancers), 1)))
+
+    values = np.stack((lights, front, up), axis=1)
+    written = crowd_index.written[rows]
+    dirty = np.flatnonzero(~np.all(np.abs(written - values) <= 1e-6, axis=(1, 2))).tolist()
+    for i in dirty:
+        obj = instancers[i]
+        for k, prop_name in enumerate(FLAT_PROPS):
+            obj[prop_name] = values[i, k].tolist()
+        obj.update_tag(refresh={'OBJECT'})
+    crowd_index.written[rows] = values
+    return len(dirty)
+
+
+def updated_objects(depsgraph):
+    """Pointers of the original objects updated in a depsgraph update."""
+    return {update.id.original.as_pointer() for update in depsgraph.updates if isinstance(update.id, bpy.types.Object)}
+
+
+def clear_crowd(scene, keep=None):
+    """Removes the crowd vectors from every collection instancer of 'scene' except those instancing 'keep'."""
+    for obj in scene.objects:
+        if obj.instance_type != 'COLLECTION' or (keep is not None and obj.instance_collection == keep):
+            continue
+        for prop_name in FLAT_PROPS:
+            if prop_name in obj:
+                del obj[prop_name]
+
+
+def is_crowd_mode(scene):
+    lvcp = getattr(scene, "LVCP", None)
+    return lvcp is not None and lvcp.crowd_mode and lvcp.crowd_collection is not None
+
+
+# region Sample
+
+
+def _read_matrices_or_zero(objects):
+    """Like read_matrices, but missing (None) objects yield zero matrices and thus zero vectors."""
+    matrices = np.zeros((len(objects), 4, 4), dtype=np.float32)
+    present = [i for i, obj in enumerate(objects) if obj is not None]
+    if present:
+        matrices[present] = read_matrices([objects[i] for i in present])
+    return matrices
+
+
+def _selected_light(item):
+    objects = item.light_group.objects if item.light_group else []
+    idx = item.light_master.get("idx", 0) if item.light_master else -1
+    return objects[idx] if 0 <= idx < len(objects) else None
+
+
+def sample_instances(scene, items, frames):
+    """
+    Steps 'scene' through 'frames' once, evaluating all 'items' together on every frame.
+    Returns an array of shape (frames, items, 3, 3) holding the light, front and up vectors.
+    """
+    items = list(items)
+    heads = [item.collection.get(utils.Constants.COLLECTION_PROP_O) if item.collection else None for item in items]
+    values = np.zeros((len(frames), len(items), 3, 3), dtype=np.float32)
+    if not items:
+        return values
+
+    frame_current = scene.frame_current
+    # Cached playback mutes the head constraints; the rig has to drive the heads while sampling
+    use_cache = is_cache_mode(scene)
+    if use_cache:
+        for item in items:
+            set_head_constraints_muted(item, False)
+    try:
+        for f, frame in enumerate(frames):
+            scene.frame_set(frame)
+            matrices = _read_matrices_or_zero(heads + [_selected_light(item) for item in items])
+            front, up = head_vectors(matrices[:len(items)])
+            values[f, :, 0] = light_vectors(matrices[len(items):])
+            values[f, :, 1] = front
+            values[f, :, 2] = up
+    finally:
+        if use_cache:
+            for item in items:
+                set_head_constraints_muted(item, True)
+        scene.frame_set(frame_current)
+    return values
+
+
+# region Bake
+
+
+BAKE_GROUP = "LVCP Bake"
+_INTERPOLATION_LINEAR = 1  # Enum value of 'LINEAR' for foreach_set
+
+
+def _bake_targets(item):
+    """(object, property) pairs a bake writes for an instance."""
+    head = item.collection.get(utils.Constants.COLLECTION_PROP_O) if item.collection else None
+    return [
+        (item.light_master, utils.Constants.OBJECT_PROP_LIGHT),
+        (head, utils.Constants.OBJECT_PROP_FRONT),
+        (head, utils.Constants.OBJECT_PROP_UP),
+    ]
+
+
+def write_keyframes(obj, prop_name, frames, vectors):
+    """Replaces the keyframes of the three components of 'prop_name' with 'vectors' in one bulk write per curve."""
+    anim = obj.animation_data or obj.animation_data_create()
+    if anim.action is None:
+        anim.action = bpy.data.actions.new(f"{obj.name}_LVCP")
+    action = anim.action
+    data_path = f'["{prop_name}"]'
+
+    co = np.empty((len(frames), 2), dtype=np.float32)
+    co[:, 0] = frames
+    for i in range(3):
+        fcurve = action.fcurves.find(data_path, index=i)
+        if fcurve:
+            action.fcurves.remove(fcurve)
+        fcurve = action.fcurves.new(data_path, index=i, action_group=BAKE_GROUP)
+        fcurve.keyframe_points.add(len(frames))
+        co[:, 1] = vectors[:, i]
+        fcurve.keyframe_points.foreach_set("co", co.ravel())
+        fcurve.keyframe_points.foreach_set("interpolation", [_INTERPOLATION_LINEAR] * len(frames))
+        fcurve.update()
+
+
+def mute_drivers(obj, prop_name, mute):
+    """Mutes or un-mutes every driver on 'prop_name' so baked F-curves can take over."""
+    anim = obj.animation_data
+    if not anim:
+        return
+    data_path = f'["{prop_name}"]'
+    for fcurve in anim.drivers:
+        if fcurve.data_path == data_path:
+            fcurve.mute = mute
+
+
+def bake_instances(scene, items, frame_start, frame_end, step=1, mute=True):
+    """
+    Bakes the vectors of 'items' over a frame range. The scene is evaluated once per
+    frame for all instances, then every curve is written in a single bulk call.
+    Returns the number of frames baked.
+    """
+    items = [item for item in items if item.collection]
+    frames = list(range(frame_start, frame_end + 1, max(1, step)))
+    values = sample_instances(scene, items, frames)
+    for i, item in enumerate(items):
+        for vec, (obj, prop_name) in enumerate(_bake_targets(item)):
+            if obj is None:
+                continue
+            write_keyframes(obj, prop_name, frames, values[:, i, vec])
+        if mute:
+            mute_instance_drivers(item, True)
+        item.is_baked = True
+    return len(frames)
+
+
+def clear_bake(items):
+    """Removes baked curves, drops empty bake actions and restores the drivers."""
+    for item in items:
+        for obj, prop_name in _bake_targets(item):
+            if obj is None:
+                continue
+            mute_drivers(obj, prop_name, False)
+            anim = obj.animation_data
+            if not anim or not anim.action:
+                continue
+            action = anim.action
+            data_path = f'["{prop_name}"]'
+            for fcurve in [fc for fc in action.fcurves if fc.data_path == data_path]:
+                action.fcurves.remove(fcurve)
+            if not action.fcurves:
+                anim.action = None
+                if action.users == 0:
+                    bpy.data.actions.remove(action)
+        item.is_baked = False
+
+
+def mute_instance_drivers(item, mute):
+    for obj, prop_name in _bake_targets(item):
+        if obj is not None:
+            mute_drivers(obj, prop_name, mute)
+
+
+# region Vector Cache
+
+
+CACHE_VERSION = 1
+
+
+def cache_paths(path):
+    """Returns the absolute (.npy, .json) pair for a cache path."""
+    base = os.path.splitext(bpy.path.abspath(path))[0]
+    return base + ".npy", base + ".json"
+
+
+def write_cache(path, scene, items, frame_start, frame_end, step=1):
+    """
+    Samples 'items' over a frame range and writes them to a fixed-layout .npy file of
+    shape (frames, instances, 3, 3) plus a small .json header naming the instances.
+    Files are written next to each other and swapped in atomically.
+    """
+    items = [item for item in items if item.collection]
+    frames = list(range(frame_start, frame_end + 1, max(1, step)))
+    values = sample_instances(scene, items, frames)
+
+    # A memory mapped file cannot be replaced on Windows
+    close_cache()
+    data_path, header_path = cache_paths(path)
+    os.makedirs(os.path.dirname(data_path) or ".", exist_ok=True)
+    header = {
+        "version": CACHE_VERSION,
+        "frame_start": frame_start,
+        "frame_step": max(1, step),
+        "frame_count": len(frames),
+        "instances": [item.name for item in items],
+        "vectors": [utils.Constants.OBJECT_PROP_LIGHT, utils.Constants.OBJECT_PROP_FRONT, utils.Constants.OBJECT_PROP_UP],
+    }
+    with open(data_path + ".tmp", "wb") as f:
+        np.save(f, np.ascontiguousarray(values, dtype=np.float32))
+    with open(header_path + ".tmp", "w") as f:
+        json.dump(header, f, indent=1)
+    os.replace(data_path + ".tmp", data_path)
+    os.replace(header_path + ".tmp", header_path)
+    return len(frames)
+
+
+class VectorCache:
+    """Read-only view of a vector cache. The data is memory mapped, so render processes share the page cache."""
+
+    def __init__(self, path):
+        self.data_path, header_path = cache_paths(path)
+        with open(header_path) as f:
+            header = json.load(f)
+        if header.get("version") != CACHE_VERSION:
+            raise ValueError(f"Unsupported LVCP cache version: {header.get('version')}")
+        self.frame_start = header["frame_start"]
+        self.frame_step = header["frame_step"]
+        self.instances = header["instances"]
+        self.mtime = os.path.getmtime(self.data_path)
+        self.data = np.load(self.data_path, mmap_mode="r")
+
+    def is_current(self, path):
+        data_path, _header_path = cache_paths(path)
+        try:
+            return data_path == self.data_path and os.path.getmtime(data_path) == self.mtime
+        except OSError:
+            return False
+
+    def sample(self, frame):
+        """Vectors of every cached instance at 'frame' (sub-frames are interpolated), shape (instances, 3, 3)."""
+        position = (frame - self.frame_start) / self.frame_step
+        last = len(self.data) - 1
+        position = min(max(position, 0.0), float(last))
+        low = int(position)
+        high = min(low + 1, last)
+        t = position - low
+        if t == 0.0:
+            return np.array(self.data[low])
+        return (1.0 - t) * self.data[low] + t * self.data[high]
+
+
+_open_cache = None
+
+
+def get_cache(path):
+    """Returns the (re)opened cache for 'path', or None if it cannot be read."""
+    global _open_cache
+    if _open_cache is not None and _open_cache.is_current(path):
+        return _open_cache
+    try:
+        _open_cache = VectorCache(path)
+    except (OSError, ValueError, KeyError):
+        _open_cache = None
+    return _open_cache
+
+
+def close_cache():
+    global _open_cache
+    _open_cache = None
+
+
+@profiler.profiled("evaluation.apply_cache")
+def apply_cache(scene):
+    """Writes the cached vectors of the current frame to every instance found in the cache."""
+    lvcp = scene.LVCP
+    cache = get_cache(lvcp.cache_path) if lvcp.cache_path else None
+    if cache is None:
+        return 0
+
+    values = cache.sample(scene.frame_current + scene.frame_subframe)
+    rows = {name: i for i, name in enumerate(cache.instances)}
+    masters, heads, master_rows, head_rows = [], [], [], []
+    for item in lvcp.lists:
+        row = rows.get(item.name)
+        if row is None or not item.collection:
+            continue
+        head = item.collection.get(utils.Constants.COLLECTION_PROP_O)
+        if item.light_master:
+            masters.append(item.light_master)
+            master_rows.append(row)
+        if head:
+            heads.append(head)
+            head_rows.append(row)
+
+    changed = set()
+    changed.update(write_vectors(masters, utils.Constants.OBJECT_PROP_LIGHT, values[master_rows, 0]))
+    changed.update(write_vectors(heads, utils.Constants.OBJECT_PROP_FRONT, values[head_rows, 1]))
+    changed.update(write_vectors(heads, utils.Constants.OBJECT_PROP_UP, values[head_rows, 2]))
+    for obj in changed:
+        obj.update_tag()
+    write_global_light(scene)
+    return len(changed)
+
+
+def set_head_constraints_muted(item, mute):
+    """Cached playback does not need the head origin to follow the rig, so its constraints can be skipped."""
+    head = item.collection.get(utils.Constants.COLLECTION_PROP_O) if item.collection else None
+    if head:
+        for constraint in head.constraints:
+            constraint.mute = mute
+
+
+def is_handler_mode(scene):
+    lvcp = getattr(scene, "LVCP", None)
+    return lvcp is not None and lvcp.eval_mode == 'HANDLER'
+
+
+@profiler.profiled("evaluation.repack_light_groups")
+def repack_light_groups(scene, depsgraph):
+    """Refreshes the packed light arrays of groups whose light empties were transformed."""
+    moved = {
+        update.id.original.name for update in depsgraph.updates
+        if isinstance(update.id, bpy.types.Object) and update.is_updated_transform
+    }
+    if not moved:
+        return
+    for item in scene.LVCP.lists:
+        master = item.light_master
+        if not master or not item.light_group or utils.Constants.OBJECT_PROP_LIGHTS_PACKED not in master:
+            continue
+        group_objects = item.light_group.objects
+        if any(name in group_objects for name in moved):
+            item.pack_light_group()
+
+
+# light master pointer -> (group size, [(index, empty)] of the animated lights)
+_animated_lights = {}
+
+
+def _is_animated(obj):
+    """Whether keys, drivers or constraints can move 'obj' on a frame change, also through its parents."""
+    while obj is not None:
+        anim = obj.animation_data
+        if obj.constraints or (anim and (anim.action or len(anim.drivers))):
+            return True
+        obj = obj.parent
+    return False
+
+
+def animated_lights(item):
+    """The animated lights of an instance's group, worked out once per group change."""
+    key = item.light_master.as_pointer()
+    objects = item.light_group.objects
+    cached = _animated_lights.get(key)
+    if cached is None or cached[0] != len(objects):
+        cached = _animated_lights[key] = (len(objects), [(i, obj) for i, obj in enumerate(objects) if _is_animated(obj)])
+    return cached[1]
+
+
+def invalidate_animated_lights(item=None):
+    if item is None:
+        _animated_lights.clear()
+    elif item.light_master:
+        _animated_lights.pop(item.light_master.as_pointer(), None)
+
+
+@profiler.profiled("evaluation.repack_animated_lights")
+def repack_animated_lights(scene):
+    """
+    Frame changes: updates only the animated lights' entries of the packed arrays, so the cost follows
+    the number of animated lights rather than the group size. Changed masters are tagged directly,
+    not through the deferred scheduler, so the frame's second evaluation pass picks them up.
+    """
+    for item in scene.LVCP.lists:
+        master = item.light_master
+        if not master or not item.light_group or utils.Constants.OBJECT_PROP_LIGHTS_PACKED not in master:
+            continue
+        animated = animated_lights(item)
+        if not animated:
+            continue
+        packed = np.array(master[utils.Constants.OBJECT_PROP_LIGHTS_PACKED], dtype=np.float32).reshape(-1, 3)
+        rows = [i for i, _obj in animated]
+        if rows[-1] >= len(packed):
+            continue  # Repacked on the next group update
+        try:
+            vectors = light_vectors(read_matrices([obj for _i, obj in animated]))
+        except ReferenceError:
+            invalidate_animated_lights(item)
+            continue
+        if np.all(np.abs(packed[rows] - vectors) <= 1e-6):
+            continue
+        packed[rows] = vectors
+        master[utils.Constants.OBJECT_PROP_LIGHTS_PACKED] = packed.ravel().tolist()
+        master.update_tag()
+
+
+def is_cache_mode(scene):
+    lvcp = getattr(scene, "LVCP", None)
+    return lvcp is not None and lvcp.eval_mode == 'CACHE'
+
+
+# region Handlers
+
+
+@persistent
+@profiler.profiled("evaluation.frame_change_pre_handler")
+def frame_change_pre_handler(scene, depsgraph=None):
+    if is_cache_mode(scene):
+        apply_cache(scene)
+        # Cached vectors are final before the frame is evaluated, so renders see them on this frame
+        if is_flat_mode(scene):
+            propagate_flat_vectors(scene)
+
+
+@persistent
+@profiler.profiled("evaluation.frame_change_post_handler")
+def frame_change_post_handler(scene, depsgraph=None):
+    if is_handler_mode(scene):
+        evaluate_scene(scene, all_lights=False)
+    elif getattr(scene, "LVCP", None) is not None:
+        repack_animated_lights(scene)
+    if is_flat_mode(scene) and not is_cache_mode(scene):
+        # Driven vectors only exist once the frame is evaluated; a render depsgraph sees them one frame late
+        propagate_flat_vectors(scene)
+    if is_crowd_mode(scene):
+        # Like the flat vectors, a render depsgraph sees these one frame late
+        evaluate_crowd(scene)
+
+
+@persistent
+@profiler.profiled("evaluation.depsgraph_update_post_handler")
+def depsgraph_update_post_handler(scene, depsgraph=None):
+    if is_handler_mode(scene):
+        evaluate_scene(scene)
+    elif depsgraph is not None and getattr(scene, "LVCP", None) is not None:
+        if depsgraph.id_type_updated('ACTION'):
+            # Keys were added or removed, the animated lights may have changed
+            invalidate_animated_lights()
+        repack_light_groups(scene, depsgraph)
+    if is_flat_mode(scene) and depsgraph is not None:
+        # Only instances touched by this update; unchanged ones are skipped, so the update this causes ends here
+        items = touched_instances(scene, depsgraph)
+        if items:
+            propagate_flat_vectors(scene, items)
+    if is_crowd_mode(scene) and depsgraph is not None:
+        if utils.is_structural_update(depsgraph) or crowd_index.is_stale(depsgraph, scene.LVCP.crowd_collection):
+            crowd_index.invalidate()
+            evaluate_crowd(scene)
+        else:
+            # Only the instancers (or the source head and light) updated by this update
+            updated = updated_objects(depsgraph)
+            if updated:
+                evaluate_crowd(scene, updated)
+
+
+# region Registration
+
+
+@persistent
+def load_pre_handler(*args):
+    close_cache()
+    crowd_index.invalidate()
+    _flat_written.clear()
+    invalidate_animated_lights()
+
+
+@persistent
+def undo_redo_post_handler(*args):
+    # Undo restores the objects' properties, so nothing written before can be trusted
+    _flat_written.clear()
+    crowd_index.invalidate()
+    invalidate_animated_lights()
+
+
+_handlers = (
+    (bpy.app.handlers.frame_change_pre, frame_change_pre_handler),
+    (bpy.app.handlers.load_pre, load_pre_handler),
+    (bpy.app.handlers.undo_post, undo_redo_post_handler),
+    (bpy.app.handlers.redo_post, undo_redo_post_handler),
+    (bpy.app.handlers.frame_change_post, frame_change_post_handler),
+    (bpy.app.handlers.depsgraph_update_post, depsgraph_update_post_handler),
+)
+
+
+def register():
+    for handler_list, handler in _handlers:
+        if handler not in handler_list:
+            handler_list.append(handler)
+
+
+def unregister():
+    for handler_list, handler in _handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)
+    close_cache()
@@ -1,105 +1,226 @@
 
 
 import bpy
+import logging
 import re
+import time
+from collections import namedtuple
 from bpy.types import Operator
+from bpy_extras.io_utils import ExportHelper, ImportHelper
 from bpy.props import StringProperty, BoolProperty, IntProperty
 from math import radians
 from mathutils import Vector
 from . import utils
+from . import evaluation
+from . import profiler
+from . import serialization
+from . import properties
+
+
+log = logging.getLogger(__name__)
 
 
 # region Helper Funcs
 
 
-def _setup_new_lvcp_instance(self, context, name, base_name, set_child_constraints, bone_name, armature_obj=None):
-    """Internal function to create a full new LVCP instance."""
+# What to create for one instance; 'armature' is None for an unparented head origin.
+# Setups of one batch with the same 'group_key' share the light group created by the first of them.
+InstanceSetup = namedtuple("InstanceSetup", "name base_name armature bone_name lights group_key", defaults=(None,))
+
 
-    # 1. Create main collection and head origin empty
-    coll = utils.create_collection(f"LVCP_{base_name}")
+def _create_light_empties(lvcp_root, light_group, base_name, lights=None):
+    """Creates the light direction empties of a new group: one per light rig entry, or the default one."""
+    empties = []
+    for i, light in enumerate(lights or [{"rotation": (radians(-90), 0.0, 0.0)}]):
+        empty = utils.add_empty(f"Light_Direction_{base_name}_{i}", light.get("size", 0.2), "SINGLE_ARROW", (0, 0, 0))
+        empty.rotation_euler = light["rotation"]
+        utils.add_custom_prop(empty, utils.Constants.OBJECT_PROP_LIGHT, [0.0, 0.0, 0.0])
+        lvcp_root.light_collection.objects.link(empty)
+        light_group.objects.link(empty)
+        empties.append(empty)
+    return empties
+
+
+def _create_instance_blocks(reporter, lvcp, setup, shared_groups):
+    """
+    Creates the collections, empties and custom properties of one instance and its list item,
+    linked straight into their parents. No drivers are built yet. 'shared_groups' maps the
+    group keys of the batch to their light groups.
+    Returns (list item, light group, active light or None, empties to hide).
+    """
+    base_name = setup.base_name
+
+    # 1. Main collection and head origin empty
+    coll = bpy.data.collections.new(f"LVCP_{base_name}")
     coll.color_tag = "COLOR_06"
+    lvcp.lvcp_collection.children.link(coll)
     oo = utils.add_empty(f"Head_Origin_{base_name}", 0.2, "PLAIN_AXES", (0, 0, 0))
     coll.objects.link(oo)
-    oo.hide_set(True)
-    
-    # 2. Add custom properties to collection
     utils.add_custom_prop(coll, utils.Constants.COLLECTION_PROP_O, oo)
     utils.edit_property(coll, utils.Constants.COLLECTION_PROP_O).update(id_type="OBJECT")
-    
-    # 3. Add custom properties to head origin
     utils.add_custom_prop(oo, utils.Constants.OBJECT_PROP_FRONT, [0.0, 0.0, 0.0])
     utils.add_custom_prop(oo, utils.Constants.OBJECT_PROP_UP, [0.0, 0.0, 0.0])
-    
-    # 4. Handle parenting constraint
-    if set_child_constraints and bone_name:
-        arm = armature_obj if armature_obj else context.active_object
-        bone = arm.pose.bones.get(bone_name)
+
+    # 2. Parenting constraint
+    if setup.armature and setup.bone_name:
+        bone = setup.armature.pose.bones.get(setup.bone_name)
         if bone:
-            oo.location = arm.matrix_world @ bone.head
+            oo.location = setup.armature.matrix_world @ bone.head
             constraint = oo.constraints.new("CHILD_OF")
-            constraint.target = arm
-            constraint.subtarget = bone_name
+            constraint.target = setup.armature
+            constraint.subtarget = setup.bone_name
         else:
-            self.report({"WARNING"}, f"Bone '{bone_name}' not found. Origin not parented.")
-
-    # 5. Create new list item in main PropertyGroup
+            reporter.report({"WARNING"}, f"Bone '{setup.bone_name}' not found. Origin not parented.")
+
+    # 3. Light group with its master and light empties, unless an earlier setup created it
+    group = shared_groups.get(setup.group_key) if setup.group_key is not None else None
+    hidden, active_light = [oo], None
+    if group is None:
+        group = bpy.data.collections.new(f"LightGroup_{base_name}")
+        utils.add_custom_prop(group, utils.Constants.COLLECTION_PROP_MASTER, None)
+        utils.edit_property(group, utils.Constants.COLLECTION_PROP_MASTER).update(id_type="OBJECT")
+        lvcp.light_collection.children.link(group)
+
+        master = utils.add_empty(f"Light_Master_{base_name}", 0.5, "PLAIN_AXES", (0, 0, 0))
+        coll.objects.link(master)
+        group[utils.Constants.COLLECTION_PROP_MASTER] = master
+        utils.add_custom_prop(master, utils.Constants.OBJECT_PROP_LIGHT, [0.0, 0.0, 0.0])
+        utils.add_custom_prop(master, "idx", 0)
+        utils.edit_property(master, "idx").update(min=0)
+        active_light = _create_light_empties(lvcp, group, base_name, setup.lights)[0]
+        hidden.append(master)
+        if setup.group_key is not None:
+            shared_groups[setup.group_key] = group
+    coll.children.link(group)
+
+    # 4. List item; the light group is assigned once the drivers are built
+    item = lvcp.add_list()
+    item.name = setup.name
+    item.collection = coll
+    return item, group, active_light, hidden
+
+
+def setup_instances(reporter, context, setups):
+    """
+    Creates the instances described by 'setups' in phases instead of one after another: every
+    collection and empty is created and linked first, then all drivers are built, then the helper
+    empties are hidden in one pass, so the view layer is synced once rather than once per character.
+    Tags are flushed once at the end. Returns (list items, seconds spent per setup).
+    """
     lvcp = utils.get_LVCP()
-    new_list_item = lvcp.add_list()
-    new_list_item.name = name
-    new_list_item.collection = coll
-    utils.link_collection(lvcp.lvcp_collection, coll, True)
-    
-    # 6. Create default light group and light empty
-    _setup_default_light_group_and_empty(self, context, new_list_item, base_name)
-    
-    # 7. Set initial drivers for the head
-    new_list_item.set_driver_head()
+    seconds = [0.0] * len(setups)
+    created, shared_groups = [], {}
+    with utils.tags.deferred():
+        for i, setup in enumerate(setups):
+            start = time.perf_counter()
+            created.append(_create_instance_blocks(reporter, lvcp, setup, shared_groups))
+            seconds[i] += time.perf_counter() - start
+
+        for i, (item, group, active_light, _hidden) in enumerate(created):
+            start = time.perf_counter()
+            item.light_group = group  # Builds the light master's and light empties' drivers
+            if active_light:
+                item.active_light = active_light
+            item.set_driver_head()
+            seconds[i] += time.perf_counter() - start
+
+        for i, (_item, _group, _active_light, hidden) in enumerate(created):
+            start = time.perf_counter()
+            for obj in hidden:
+                obj.hide_set(True)
+            seconds[i] += time.perf_counter() - start
+    return [c[0] for c in created], seconds
+
+
+def _setup_new_lvcp_instance(self, context, name, base_name, set_child_constraints, bone_name, armature_obj=None, lights=None):
+    """Internal function to create a full new LVCP instance. 'lights' are light rig entries replacing the default light."""
+    armature = (armature_obj or context.active_object) if set_child_constraints else None
+    items, _seconds = setup_instances(self, context, [InstanceSetup(name, base_name, armature, bone_name, lights)])
     self.report({"INFO"}, f"Added new LVCP instance: '{name}'")
+    return items[0]
 
-    return new_list_item
 
+def _find_profile_meshes(armature, profile):
+    """Child meshes of 'armature' whose names (ignoring .001 suffixes) are listed in the profile."""
+    return [
+        child for child in armature.children
+        if child.type == 'MESH' and child.name.split('.')[0] in profile.mesh_names
+    ]
 
 
-def _setup_default_light_group_and_empty(self, context, lvcp_list_item, base_name):
-    """Internal function to create a default light setup for an LVCP instance."""
-    lvcp_root = utils.get_LVCP()
-    
-    # Create Light Group Collection
-    group_name = f"LightGroup_{base_name}"
-    coll = utils.create_collection(group_name)
-    utils.add_custom_prop(coll, utils.Constants.COLLECTION_PROP_MASTER, None)
-    utils.edit_property(coll, utils.Constants.COLLECTION_PROP_MASTER).update(id_type="OBJECT")
-    utils.link_collection(lvcp_root.light_collection, coll, True)
-    
-    # Assign group to the LVCP instance
-    lvcp_list_item.light_group = coll
-    utils.link_collection(lvcp_list_item.collection, coll, True)
-    
-    # Create Light Master Empty
-    master = utils.add_empty(f"Light_Master_{base_name}", 0.5, "PLAIN_AXES", (0, 0, 0))
-    lvcp_list_item.collection.objects.link(master)
-    master.hide_set(True)
-    coll[utils.Constants.COLLECTION_PROP_MASTER] = master
-    utils.add_custom_prop(master, utils.Constants.OBJECT_PROP_LIGHT, [0.0, 0.0, 0.0])
-    utils.add_custom_prop(master, "idx", 0)
-    utils.edit_property(master, "idx").update(min=0)
-    lvcp_list_item.light_master = master
-    
-    # Create default Light Direction Empty
-    empty = utils.add_empty(f"Light_Direction_{base_name}_0", 0.2, "SINGLE_ARROW", (0, 0, 0))
-    empty.rotation_euler.x = radians(-90)
-    utils.add_custom_prop(empty, utils.Constants.OBJECT_PROP_LIGHT, [0.0, 0.0, 0.0])
-    utils.set_drivers(
-        target_context=empty, prop_name=utils.Constants.OBJECT_PROP_LIGHT, # Use constant
-        expression="var0", obs=[empty],
-        path1="matrix_world", path2="[2]", path3="index"
+def _link_profile_meshes(item, candidate):
+    linked = _find_profile_meshes(candidate.armature, candidate.profile)
+    for obj in linked:
+        utils.link_object(obj, item.collection)
+    if linked:
+        item.sync_linked_objects()
+    return linked
+
+
+def _setup_armature_candidate(self, context, candidate):
+    """Creates the instance for an auto-setup candidate and links its meshes. Returns (instance, linked meshes)."""
+    new_list_item = _setup_new_lvcp_instance(
+        self, context, candidate.base_name, candidate.base_name, True,
+        candidate.profile.head_bone, armature_obj=candidate.armature,
     )
-    lvcp_root.light_collection.objects.link(empty)
-    lvcp_list_item.light_group.objects.link(empty)
-    
-    # Finalize
-    lvcp_list_item.update_light_group(context)
-    lvcp_list_item.active_light = empty
+    if not new_list_item:
+        return None, []
+    return new_list_item, _link_profile_meshes(new_list_item, candidate)
+
+
+_LOG_LEVELS = {"ERROR": logging.ERROR, "WARNING": logging.WARNING, "INFO": logging.INFO}
+
+
+class _LogReporter:
+    """Stand-in for Operator.report when the helpers are called from scripts."""
+    def report(self, type, message):
+        level = max(_LOG_LEVELS.get(t, logging.INFO) for t in type) if type else logging.INFO
+        log.log(level, message)
+
+
+def auto_setup_armatures(context, armature_names=None, reporter=None):
+    """
+    Python API: sets up every auto-setup candidate (or only those in 'armature_names')
+    that has no instance yet, in one batched pass (see setup_instances). Mesh updates are
+    tagged and flushed with a single view layer update at the end. Returns a list of
+    per-character timings:
+    [{"armature": str, "instance": str, "seconds": float, "linked_meshes": int}, ...]
+    """
+    reporter = reporter or _LogReporter()
+    lvcp, _created = utils.ensure_initial_collections()
+
+    candidates = utils.armature_index.candidates(context.scene)
+    if armature_names is not None:
+        wanted = set(armature_names)
+        candidates = [c for c in candidates if c.name in wanted]
+
+    existing = utils.get_instances_by_collection_name(lvcp)
+    todo = []
+    for candidate in candidates:
+        # Two armatures with the same base name would get the same collection
+        if f"LVCP_{candidate.base_name}" not in existing:
+            existing[f"LVCP_{candidate.base_name}"] = None
+            todo.append(candidate)
+    if not todo:
+        return []
+
+    setups = [InstanceSetup(c.base_name, c.base_name, c.armature, c.profile.head_bone, None) for c in todo]
+    with utils.tags.deferred():
+        items, seconds = setup_instances(reporter, context, setups)
+        timings = []
+        for candidate, item, elapsed in zip(todo, items, seconds):
+            start = time.perf_counter()
+            linked = _link_profile_meshes(item, candidate)
+            for obj in linked:
+                utils.tags.tag(obj)
+            timings.append({
+                "armature": candidate.name,
+                "instance": item.name,
+                "seconds": elapsed + time.perf_counter() - start,
+                "linked_meshes": len(linked),
+            })
+    context.view_layer.update()
+    return timings
 
 
 # region Create Instance
@@ -144,27 +265,121 @@ class LVCP_OT_CreateInstance(Operator):
 # region Delete Instance
 
 
+def _instances_of_objects(lvcp, objects):
+    """Indices of the instances that own or are linked to any of 'objects'."""
+    pointers = set()
+    for obj in objects:
+        linked = obj.get(utils.Constants.OBJECT_PROP_COL)
+        if linked is not None:
+            pointers.add(linked.as_pointer())
+        pointers.update(c.as_pointer() for c in obj.users_collection)
+    indices = []
+    for i, item in enumerate(lvcp.lists):
+        if not item.collection:
+            continue
+        collections = [item.collection] + list(item.collection.children_recursive)
+        if any(c.as_pointer() in pointers for c in collections):
+            indices.append(i)
+    return indices
+
+
+def delete_instances(indices):
+    """
+    Deletes the instances at 'indices' with one bpy.data.batch_remove call: their collections,
+    objects (with their drivers) and bake actions, and every light group no remaining instance uses.
+    Linked meshes lose their 'lvcp' pointer. Returns the number of removed IDs.
+    """
+    lvcp = utils.get_LVCP()
+    doomed = set(indices)
+    remaining = [item for i, item in enumerate(lvcp.lists) if i not in doomed]
+
+    # Light groups and objects still used by a remaining instance are kept
+    kept = set()
+    for item in remaining:
+        for id_block in (item.collection, item.light_group, item.light_master):
+            if id_block:
+                kept.add(id_block.as_pointer())
+        if item.light_group:
+            kept.update(obj.as_pointer() for obj in item.light_group.all_objects)
+        if item.collection:
+            kept.update(obj.as_pointer() for obj in item.collection.all_objects)
+
+    collections, objects = {}, {}
+    for i in doomed:
+        item = lvcp.lists[i]
+        groups = [item.collection, item.light_group]
+        if item.collection:
+            groups += list(item.collection.children_recursive)
+            for obj in utils.get_objects_with_lvcp(item):
+                utils.unlink_object(obj)
+                utils.tags.tag_data(obj)
+        for coll in groups:
+            if coll and coll.as_pointer() not in kept:
+                collections[coll.as_pointer()] = coll
+                objects.update((obj.as_pointer(), obj) for obj in coll.all_objects if obj.as_pointer() not in kept)
+
+    actions = {}
+    for obj in objects.values():
+        action = obj.animation_data.action if obj.animation_data else None
+        if action and action.users == 1:
+            actions[action.as_pointer()] = action
+
+    for i in range(len(lvcp.light_group) - 1, -1, -1):
+        coll = lvcp.light_group[i].collection
+        if coll and coll.as_pointer() in collections:
+            lvcp.light_group.remove(i)
+    lvcp.remove_lists(doomed)
+
+    ids = list(objects.values()) + list(collections.values()) + list(actions.values())
+    bpy.data.batch_remove(ids)
+    utils.linked_index.invalidate()
+    utils.armature_index.invalidate()
+
+    # The scene driver and the crowd must not keep pointing at removed masters; the updates resync them
+    if lvcp.crowd_source and lvcp.crowd_source not in lvcp.lists:
+        lvcp.crowd_source = ""
+    else:
+        evaluation.crowd_index.invalidate()
+    if lvcp.global_light_source and lvcp.global_light_source not in lvcp.lists:
+        lvcp.global_light_source = ""
+    lvcp.sync_global_light(bpy.context)
+    return len(ids)
+
+
 class LVCP_OT_DeleteInstance(Operator):
     bl_idname = "lvcp.delete_instance"
     bl_label = "Delete Instance"
     bl_options = {"REGISTER", "UNDO"}
 
+    mode: bpy.props.EnumProperty(
+        name="Delete",
+        items=[
+            ('ACTIVE', "Active Instance", "Delete the active instance"),
+            ('SELECTED', "Selected Instances", "Delete every instance owning or linked to a selected object"),
+            ('ALL', "All Instances", "Delete every instance"),
+        ],
+        default='ACTIVE',
+    )
+
     @classmethod
     def poll(cls, context):
-        return utils.get_LVCP().list is not None
+        return len(utils.get_LVCP().lists) > 0
 
-    def execute(self, context):
+    def _indices(self, context):
         lvcp = utils.get_LVCP()
-        list_item = lvcp.list
-        if list_item.collection:
-            # First remove child collections, then objects, then the parent
-            for child in list(list_item.collection.children):
-                for obj in list(child.objects): bpy.data.objects.remove(obj)
-                bpy.data.collections.remove(child)
-            for obj in list(list_item.collection.objects): bpy.data.objects.remove(obj)
-            bpy.data.collections.remove(list_item.collection)
-        lvcp.remove_list()
-        self.report({"INFO"}, f"Deleted LVCP instance.")
+        if self.mode == 'ALL':
+            return list(range(len(lvcp.lists)))
+        if self.mode == 'SELECTED':
+            return _instances_of_objects(lvcp, context.selected_objects)
+        return [lvcp.idx] if lvcp.list is not None else []
+
+    def execute(self, context):
+        indices = self._indices(context)
+        if not indices:
+            self.report({"WARNING"}, "No LVCP instance to delete.")
+            return {'CANCELLED'}
+        removed = delete_instances(indices)
+        self.report({"INFO"}, f"Deleted {len(indices)} LVCP instance(s) ({removed} data-blocks).")
         return {"FINISHED"}
     
     def invoke(self, context, _event):
@@ -172,7 +387,14 @@ class LVCP_OT_DeleteInstance(Operator):
         
     def draw(self, context):
         layout = self.layout
-        layout.label(text=f"Really delete '{utils.get_LVCP().list.name}' and all its objects?", icon='TRASH')
+        layout.prop(self, "mode", text="")
+        lvcp = utils.get_LVCP()
+        indices = self._indices(context)
+        if self.mode == 'ACTIVE' and indices:
+            text = f"Really delete '{lvcp.list.name}' and all its objects?"
+        else:
+            text = f"Really delete {len(indices)} instance(s) and all their objects?"
+        layout.label(text=text, icon='TRASH')
 
 
 # region AutoSetup For HSR
@@ -188,70 +410,240 @@ class LVCP_OT_AutoSetupForArmature(Operator):
 
     @classmethod
     def poll(cls, context):
-        found_armatures = utils.find_suitable_armatures(context)
-        return len(found_armatures) > 0
+        return len(utils.armature_index.candidates(context.scene)) > 0
 
     def execute(self, context):
         utils.ensure_initial_collections()
 
-        arm = None
-        found_armatures = utils.find_suitable_armatures(context)
+        candidate = None
         
         # If armature_name is specified, use it
         if self.armature_name:
-            arm = context.scene.objects.get(self.armature_name)
             # Validate the armature
-            if not arm:
+            if not context.scene.objects.get(self.armature_name):
                 self.report({"ERROR"}, f"Armature '{self.armature_name}' not found.")
                 return {'CANCELLED'}
-            # Check if it matches the pattern and has Head_M bone
-            if arm not in found_armatures:
+            # Check if it matches a naming profile and has the profile's head bone
+            candidate = utils.find_armature_candidate(context, self.armature_name)
+            if not candidate:
                 self.report({"ERROR"}, f"Armature '{self.armature_name}' is not valid for auto-setup.")
                 return {'CANCELLED'}
         else:
             # Find the first suitable armature
-            if found_armatures:
-                arm = found_armatures[0]
+            candidates = utils.armature_index.candidates(context.scene)
+            if candidates:
+                candidate = candidates[0]
 
-        if not arm:
+        if not candidate:
             self.report({"ERROR"}, "No suitable armature found for auto-setup.")
             return {'CANCELLED'}
 
-        armature_name = arm.name
-        base_name = utils.get_base_name_from_armature(armature_name)
+        base_name = candidate.base_name
         
         # Check if an instance already exists for this armature
         lvcp = utils.get_LVCP()
-        existing_instance = None
-        for item in lvcp.lists:
-            if item.collection and item.collection.name == f"LVCP_{base_name}":
-                existing_instance = item
-                break
-                
-        if existing_instance:
+        if f"LVCP_{base_name}" in utils.get_instances_by_collection_name(lvcp):
             self.report({"WARNING"}, f"LVCP instance for '{base_name}' already exists.")
             return {'CANCELLED'}
         
-        new_list_item = _setup_new_lvcp_instance(self, context, base_name, base_name, True, "Head_M", armature_obj=arm)
+        new_list_item, linked = _setup_armature_candidate(self, context, candidate)
         
-        if new_list_item:
-            meshes_to_link = []
-            target_mesh_names = {"Body", "Face", "Hair"}
-            for child in arm.children:
-                if child.type == 'MESH':
-                    # Check if the mesh name matches target names (with or without numeric suffixes)
-                    base_name = child.name.split('.')[0]  # Get the base name without .001, .002, etc.
-                    if base_name in target_mesh_names:
-                        meshes_to_link.append(child)
-            
-            if meshes_to_link:
-                collection = new_list_item.collection
-                for obj in meshes_to_link:
-                    utils.add_custom_prop(obj, utils.Constants.OBJECT_PROP_COL, collection)
-                    utils.edit_property(obj, utils.Constants.OBJECT_PROP_COL).update(id_type="COLLECTION")
-                    obj.data.update()
-                self.report({"INFO"}, f"Auto-linked {len(meshes_to_link)} meshes to '{base_name}'.")
+        if linked:
+            for obj in linked:
+                utils.tags.tag_data(obj)
+            self.report({"INFO"}, f"Auto-linked {len(linked)} meshes to '{base_name}'.")
+
+        return {"FINISHED"}
 
+
+# region Templates
+
+
+def load_template(filepath, collection_name):
+    """Appends the template instance collection (with its objects, drivers and light group) from a library .blend."""
+    with bpy.data.libraries.load(bpy.path.abspath(filepath), link=False) as (data_from, data_to):
+        if collection_name not in data_from.collections:
+            raise ValueError(f"'{collection_name}' not found in '{filepath}'.")
+        data_to.collections = [collection_name]
+    return data_to.collections[0]
+
+
+def _remap_id_props(id_block, mapping):
+    for key in id_block.keys():
+        value = id_block[key]
+        if isinstance(value, bpy.types.ID) and value.as_pointer() in mapping:
+            id_block[key] = mapping[value.as_pointer()]
+
+
+def copy_instance_tree(collection):
+    """
+    Copies an instance collection with its child collections and objects in memory, which is
+    much cheaper than appending the template again. ID pointers (LL, OO, lightMaster) and
+    parents are remapped to the copies; drivers are fixed by rebuild_drivers afterwards.
+    """
+    mapping = {}
+    collections = [collection] + list(collection.children_recursive)
+    for coll in collections:
+        mapping[coll.as_pointer()] = coll.copy()
+        for obj in coll.objects:
+            if obj.as_pointer() not in mapping:
+                copy = obj.copy()
+                if copy.animation_data:
+                    copy.animation_data.action = None
+                mapping[obj.as_pointer()] = copy
+
+    for coll in collections:
+        new_coll = mapping[coll.as_pointer()]
+        # Collection.copy links the original children and objects, swap them for the copies
+        for child in list(new_coll.children):
+            new_coll.children.unlink(child)
+            new_coll.children.link(mapping[child.as_pointer()])
+        for obj in list(new_coll.objects):
+            new_coll.objects.unlink(obj)
+            new_coll.objects.link(mapping[obj.as_pointer()])
+    for old_key, new_id in mapping.items():
+        _remap_id_props(new_id, mapping)
+        if isinstance(new_id, bpy.types.Object) and new_id.parent and new_id.parent.as_pointer() in mapping:
+            new_id.parent = mapping[new_id.parent.as_pointer()]
+    return mapping[collection.as_pointer()]
+
+
+def _rename_template(collection, template_base, base_name):
+    for id_block in list(collection.children_recursive) + list(collection.all_objects):
+        if template_base in id_block.name:
+            id_block.name = id_block.name.replace(template_base, base_name)
+    # Existing instances are recognised by this name
+    collection.name = f"LVCP_{base_name}"
+
+
+def adopt_template(context, collection, template_base, candidate):
+    """Turns an appended or copied template collection into an instance bound to 'candidate'."""
+    lvcp = utils.get_LVCP()
+    base_name = candidate.base_name
+    _rename_template(collection, template_base, base_name)
+    lvcp.lvcp_collection.children.link(collection)
+
+    light_group = next((c for c in collection.children if utils.Constants.COLLECTION_PROP_MASTER in c), None)
+    if light_group:
+        if light_group.name not in lvcp.light_collection.children:
+            lvcp.light_collection.children.link(light_group)
+        for obj in light_group.objects:
+            if utils.Constants.OBJECT_PROP_LIGHT in obj and obj.name not in lvcp.light_collection.objects:
+                lvcp.light_collection.objects.link(obj)
+
+    # Retarget the head origin to the armature's head bone
+    head_origin = collection.get(utils.Constants.COLLECTION_PROP_O)
+    bone = candidate.armature.pose.bones.get(candidate.profile.head_bone)
+    if head_origin and bone:
+        constraint = next((c for c in head_origin.constraints if c.type == 'CHILD_OF'), None) or head_origin.constraints.new("CHILD_OF")
+        constraint.target = candidate.armature
+        constraint.subtarget = bone.name
+        head_origin.location = candidate.armature.matrix_world @ bone.head
+        # Same as the set-inverse a fresh setup gets, so the origin keeps its placement and orientation
+        constraint.inverse_matrix = (candidate.armature.matrix_world @ bone.matrix).inverted()
+
+    item = lvcp.add_list()
+    item.name = base_name
+    item.collection = collection
+    # Builds the light master's and the empties' drivers for the current evaluation mode
+    item.light_group = light_group
+    item.set_driver_head()
+
+    linked = _find_profile_meshes(candidate.armature, candidate.profile)
+    for obj in linked:
+        utils.link_object(obj, collection)
+        utils.tags.tag_data(obj)
+    if linked:
+        item.sync_linked_objects()
+    return item
+
+
+def setup_from_template(context, filepath, template_name, candidates):
+    """Creates one instance per candidate from a library template: one append, then in-memory copies."""
+    utils.ensure_initial_collections()
+    template = load_template(filepath, template_name)
+    # Appending may bring in another copy of the node groups
+    consolidate_node_groups(utils.get_LVCP())
+    template_base = template_name[len("LVCP_"):] if template_name.startswith("LVCP_") else template_name
+
+    items = []
+    for i, candidate in enumerate(candidates):
+        collection = template if i == len(candidates) - 1 else copy_instance_tree(template)
+        items.append(adopt_template(context, collection, template_base, candidate))
+    if not candidates:
+        bpy.data.batch_remove([template] + list(template.children_recursive) + list(template.all_objects))
+    return items
+
+
+class LVCP_OT_SetupFromTemplate(Operator):
+    """Sets up instances for the detected armatures from the template library set in the preferences."""
+    bl_idname = "lvcp.setup_from_template"
+    bl_label = "Setup from Template"
+    bl_options = {"REGISTER", "UNDO"}
+
+    armature_names: StringProperty(
+        name="Armatures",
+        description="Comma separated armature names. Leave empty to set up every detected armature",
+        default="",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        prefs = utils.get_preferences()
+        return prefs is not None and prefs.template_library and len(utils.armature_index.candidates(context.scene)) > 0
+
+    def execute(self, context):
+        prefs = utils.get_preferences()
+        lvcp = utils.get_LVCP()
+        existing = utils.get_instances_by_collection_name(lvcp)
+        names = {n.strip() for n in self.armature_names.split(",") if n.strip()}
+        candidates = [
+            c for c in utils.armature_index.candidates(context.scene)
+            if f"LVCP_{c.base_name}" not in existing and (not names or c.name in names)
+        ]
+        if not candidates:
+            self.report({"WARNING"}, "No armatures left to set up.")
+            return {'CANCELLED'}
+
+        start = time.perf_counter()
+        try:
+            items = setup_from_template(context, prefs.template_library, prefs.template_collection, candidates)
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Could not load template: {e}")
+            return {'CANCELLED'}
+        self.report({"INFO"}, f"Set up {len(items)} instance(s) from '{prefs.template_collection}' in {time.perf_counter() - start:.3f}s.")
+        return {"FINISHED"}
+
+
+# region AutoSetup All
+
+
+class LVCP_OT_AutoSetupAll(Operator):
+    """Sets up an LVCP instance for every detected armature in one undo step."""
+    bl_idname = "lvcp.auto_setup_all"
+    bl_label = "Auto-Setup All Armatures"
+    bl_options = {"REGISTER", "UNDO"}
+
+    armature_names: StringProperty(
+        name="Armatures",
+        description="Comma separated armature names. Leave empty to set up every detected armature",
+        default="",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return len(utils.armature_index.candidates(context.scene)) > 0
+
+    def execute(self, context):
+        names = [n.strip() for n in self.armature_names.split(",") if n.strip()] or None
+        timings = auto_setup_armatures(context, names, reporter=self)
+        if not timings:
+            self.report({"WARNING"}, "No armatures left to set up.")
+            return {'CANCELLED'}
+
+        total = sum(t["seconds"] for t in timings)
+        slowest = max(timings, key=lambda t: t["seconds"])
+        self.report({"INFO"}, f"Set up {len(timings)} instance(s) in {total:.3f}s (slowest: '{slowest['instance']}' {slowest['seconds']:.3f}s).")
         return {"FINISHED"}
 
 
@@ -275,11 +667,14 @@ class LVCP_OT_LinkObjects(Operator):
         count = 0
         for obj in context.selected_objects:
             if obj.type == 'MESH':
-                utils.add_custom_prop(obj, utils.Constants.OBJECT_PROP_COL, collection)
-                utils.edit_property(obj, utils.Constants.OBJECT_PROP_COL).update(id_type="COLLECTION")
-                obj.data.update()
+                utils.link_object(obj, collection)
+                utils.tags.tag_data(obj)
                 count += 1
 
+        # Objects may have been moved over from other instances
+        for item in utils.get_LVCP().lists:
+            item.sync_linked_objects()
+
         self.report({"INFO"}, f"Linked {count} objects to '{lvcp_list.name}'.")
         return {"FINISHED"}
 
@@ -312,11 +707,13 @@ class LVCP_OT_UnlinkObjects(Operator):
             objects_to_unlink = context.selected_objects
 
         for obj in objects_to_unlink:
-            if utils.Constants.OBJECT_PROP_COL in obj:
-                del obj[utils.Constants.OBJECT_PROP_COL]
-                obj.data.update()
+            if utils.unlink_object(obj):
+                utils.tags.tag_data(obj)
                 count += 1
 
+        for item in utils.get_LVCP().lists:
+            item.sync_linked_objects()
+
         self.report({"INFO"}, f"Unlinked {count} objects from '{lvcp_list.name}'.")
         return {"FINISHED"}
 
@@ -324,53 +721,184 @@ class LVCP_OT_UnlinkObjects(Operator):
 # region Create Node Groups
 
 
-class LVCP_OT_CreateNodeGroups(Operator):
-    bl_idname = "lvcp.create_node_groups"
-    bl_label = "Create Node Groups"
-    bl_options = {"REGISTER", "UNDO"}
+# Node group variants: '' follows the LVCP pointers, 'FLAT' reads the vectors copied onto the
+# object and 'CROWD' reads the same properties from the instancing empty
+_VARIANT_NAMES = {
+    '': (utils.Constants.NODE_OUTPUT_LIGHT, utils.Constants.HEAD_VECTOR_NODE_NAME),
+    'FLAT': (utils.Constants.FLAT_LIGHT_NODE_NAME, utils.Constants.FLAT_HEAD_NODE_NAME),
+    'CROWD': (utils.Constants.CROWD_LIGHT_NODE_NAME, utils.Constants.CROWD_HEAD_NODE_NAME),
+}
 
-    def execute(self, context):
-        lvcp = utils.get_LVCP()
-        if lvcp.head_vector_nodetree and lvcp.light_vector_nodetree:
-            self.report({"ERROR"}, "Node groups already exist.")
-            return {'CANCELLED'}
 
-        # Light Vector Node
-        g_light = bpy.data.node_groups.new(type="ShaderNodeTree", name=utils.Constants.NODE_OUTPUT_LIGHT)
-        g_light_out = g_light.nodes.new("NodeGroupOutput")
+def _variant_kind(base, variant):
+    return f"{base}_{variant}" if variant else base
 
-        g_light.interface.new_socket(utils.Constants.NODE_OUTPUT_LIGHT, in_out="OUTPUT", socket_type="NodeSocketVector")
 
+def build_light_vector_group(variant=''):
+    g_light = bpy.data.node_groups.new(type="ShaderNodeTree", name=_VARIANT_NAMES[variant][0])
+    g_light_out = g_light.nodes.new("NodeGroupOutput")
+
+    g_light.interface.new_socket(utils.Constants.NODE_OUTPUT_LIGHT, in_out="OUTPUT", socket_type="NodeSocketVector")
+
+    if variant:
+        attr_path_light = f'["{utils.Constants.OBJECT_PROP_FLAT_LIGHT}"]'
+    else:
         attr_path_light = f'["{utils.Constants.OBJECT_PROP_COL}"]["{utils.Constants.COLLECTION_PROP_L}"]["{utils.Constants.OBJECT_PROP_LIGHT}"]'
 
-        ll = utils.add_attribute_node(g_light, attr_path_light, utils.Constants.COLLECTION_PROP_L, "OBJECT")
+    ll = utils.add_attribute_node(g_light, attr_path_light, utils.Constants.COLLECTION_PROP_L, "INSTANCER" if variant == 'CROWD' else "OBJECT")
 
-        g_light.links.new(g_light_out.inputs[utils.Constants.NODE_OUTPUT_LIGHT], ll.outputs["Vector"])
+    g_light.links.new(g_light_out.inputs[utils.Constants.NODE_OUTPUT_LIGHT], ll.outputs["Vector"])
+    utils.stamp_node_group(g_light, _variant_kind('LIGHT', variant))
+    return g_light
 
-        lvcp.light_vector_nodetree = g_light
-        
-        # Head Vector Node
-        g_head = bpy.data.node_groups.new(type="ShaderNodeTree", name=utils.Constants.HEAD_VECTOR_NODE_NAME)
-        g_head_out = g_head.nodes.new("NodeGroupOutput")
 
-        g_head.interface.new_socket(utils.Constants.NODE_OUTPUT_FORWARD, in_out="OUTPUT", socket_type="NodeSocketVector")
-        g_head.interface.new_socket(utils.Constants.NODE_OUTPUT_UP, in_out="OUTPUT", socket_type="NodeSocketVector")
+def build_head_vector_group(variant=''):
+    g_head = bpy.data.node_groups.new(type="ShaderNodeTree", name=_VARIANT_NAMES[variant][1])
+    g_head_out = g_head.nodes.new("NodeGroupOutput")
+
+    g_head.interface.new_socket(utils.Constants.NODE_OUTPUT_FORWARD, in_out="OUTPUT", socket_type="NodeSocketVector")
+    g_head.interface.new_socket(utils.Constants.NODE_OUTPUT_UP, in_out="OUTPUT", socket_type="NodeSocketVector")
 
+    if variant:
+        attr_path_forward = f'["{utils.Constants.OBJECT_PROP_FLAT_FRONT}"]'
+        attr_path_up = f'["{utils.Constants.OBJECT_PROP_FLAT_UP}"]'
+    else:
         attr_path_forward = f'["{utils.Constants.OBJECT_PROP_COL}"]["{utils.Constants.COLLECTION_PROP_O}"]["{utils.Constants.OBJECT_PROP_FRONT}"]'
         attr_path_up = f'["{utils.Constants.OBJECT_PROP_COL}"]["{utils.Constants.COLLECTION_PROP_O}"]["{utils.Constants.OBJECT_PROP_UP}"]'
 
-        ff = utils.add_attribute_node(g_head, attr_path_forward, "Forward", "OBJECT")
-        uu = utils.add_attribute_node(g_head, attr_path_up, "Up", "OBJECT")
+    attr_type = "INSTANCER" if variant == 'CROWD' else "OBJECT"
+    ff = utils.add_attribute_node(g_head, attr_path_forward, "Forward", attr_type)
+    uu = utils.add_attribute_node(g_head, attr_path_up, "Up", attr_type)
+
+    g_head.links.new(g_head_out.inputs[utils.Constants.NODE_OUTPUT_FORWARD], ff.outputs["Vector"])
+    g_head.links.new(g_head_out.inputs[utils.Constants.NODE_OUTPUT_UP], uu.outputs["Vector"])
+    utils.stamp_node_group(g_head, _variant_kind('HEAD', variant))
+    return g_head
+
+
+def build_global_light_group():
+    """
+    Reads the light from the scene (View Layer attribute), written once per frame, instead of
+    following every object's LVCP pointers. Instances marked 'Own Light' use the standard group.
+    """
+    g_light = bpy.data.node_groups.new(type="ShaderNodeTree", name=utils.Constants.GLOBAL_LIGHT_NODE_NAME)
+    g_light_out = g_light.nodes.new("NodeGroupOutput")
+    g_light.interface.new_socket(utils.Constants.NODE_OUTPUT_LIGHT, in_out="OUTPUT", socket_type="NodeSocketVector")
+
+    gl = utils.add_attribute_node(g_light, utils.Constants.SCENE_PROP_LIGHT, "Global", "VIEW_LAYER")
+
+    g_light.links.new(g_light_out.inputs[utils.Constants.NODE_OUTPUT_LIGHT], gl.outputs["Vector"])
+    utils.stamp_node_group(g_light, 'LIGHT_GLOBAL')
+    return g_light
+
+
+# Generated node group kind -> the LVCP pointer holding its tree
+_NODE_GROUP_POINTERS = {
+    'LIGHT': 'light_vector_nodetree',
+    'HEAD': 'head_vector_nodetree',
+    'LIGHT_GLOBAL': 'global_light_nodetree',
+    'LIGHT_FLAT': 'flat_light_nodetree',
+    'HEAD_FLAT': 'flat_head_nodetree',
+    'LIGHT_CROWD': 'crowd_light_nodetree',
+    'HEAD_CROWD': 'crowd_head_nodetree',
+}
+
+
+def _find_node_group(kind):
+    """An existing generated group of 'kind' (e.g. appended with a character), preferring the unsuffixed one."""
+    groups = [g for g in bpy.data.node_groups if g.bl_idname == "ShaderNodeTree" and utils.node_group_kind(g) == kind]
+    return min(groups, key=lambda g: (g.library is not None, len(g.name), g.name)) if groups else None
+
+
+def consolidate_node_groups(lvcp):
+    """
+    Merges duplicates of the generated node groups ('Light_Vector.001', ...) into one canonical
+    tree per kind: the one LVCP points at, else the unsuffixed one. Duplicates are merged if they
+    compute the same thing or are an older generated version; edited groups are kept.
+    Returns (removed groups, names of kept groups that differ).
+    """
+    pointers = _NODE_GROUP_POINTERS
+    by_kind = {}
+    for group in bpy.data.node_groups:
+        kind = utils.node_group_kind(group) if group.bl_idname == "ShaderNodeTree" and not group.library else None
+        if kind:
+            by_kind.setdefault(kind, []).append(group)
+
+    removed, kept = [], []
+    for kind, groups in by_kind.items():
+        canonical = getattr(lvcp, pointers[kind]) if kind in pointers else None
+        if canonical is None or canonical.library:
+            canonical = min(groups, key=lambda g: (len(g.name), g.name))
+            if kind in pointers:
+                setattr(lvcp, pointers[kind], canonical)
+        canonical_hash = utils.node_group_hash(canonical)
+        canonical_version = canonical.get(utils.Constants.NODE_GROUP_VERSION, 0)
+        for group in groups:
+            if group == canonical:
+                continue
+            outdated = group.get(utils.Constants.NODE_GROUP_VERSION, 0) < canonical_version and group.get(utils.Constants.NODE_GROUP_HASH) == utils.node_group_hash(group)
+            if utils.node_group_hash(group) == canonical_hash or outdated:
+                group.user_remap(canonical)
+                removed.append(group)
+            else:
+                kept.append(group.name)
+    if removed:
+        bpy.data.batch_remove(removed)
+    return len(removed), kept
+
+
+class LVCP_OT_CreateNodeGroups(Operator):
+    bl_idname = "lvcp.create_node_groups"
+    bl_label = "Create Node Groups"
+    bl_options = {"REGISTER", "UNDO"}
+
+    global_light: BoolProperty(name="Global Light", description="Also create the node group reading the global light", default=False)
+    flat: BoolProperty(name="Flat Vectors", description="Also create the node groups reading the vectors copied onto each object", default=False)
+    crowd: BoolProperty(name="Crowd", description="Also create the node groups reading the crowd vectors from the instancer", default=False)
 
-        g_head.links.new(g_head_out.inputs[utils.Constants.NODE_OUTPUT_FORWARD], ff.outputs["Vector"])
-        g_head.links.new(g_head_out.inputs[utils.Constants.NODE_OUTPUT_UP], uu.outputs["Vector"])
+    def execute(self, context):
+        lvcp = utils.get_LVCP()
+        missing_global = self.global_light and not lvcp.global_light_nodetree
+        missing_flat = self.flat and not (lvcp.flat_light_nodetree and lvcp.flat_head_nodetree)
+        missing_crowd = self.crowd and not (lvcp.crowd_light_nodetree and lvcp.crowd_head_nodetree)
+        if lvcp.head_vector_nodetree and lvcp.light_vector_nodetree and not (missing_global or missing_flat or missing_crowd):
+            self.report({"ERROR"}, "Node groups already exist.")
+            return {'CANCELLED'}
 
-        lvcp.head_vector_nodetree = g_head
+        # Reuse groups that came in with appended characters instead of adding another copy
+        if not lvcp.light_vector_nodetree:
+            lvcp.light_vector_nodetree = _find_node_group('LIGHT') or build_light_vector_group()
+        if not lvcp.head_vector_nodetree:
+            lvcp.head_vector_nodetree = _find_node_group('HEAD') or build_head_vector_group()
+        if self.global_light and not lvcp.global_light_nodetree:
+            lvcp.global_light_nodetree = _find_node_group('LIGHT_GLOBAL') or build_global_light_group()
+        if self.flat and not lvcp.flat_light_nodetree:
+            lvcp.flat_light_nodetree = _find_node_group('LIGHT_FLAT') or build_light_vector_group('FLAT')
+        if self.flat and not lvcp.flat_head_nodetree:
+            lvcp.flat_head_nodetree = _find_node_group('HEAD_FLAT') or build_head_vector_group('FLAT')
+        if self.crowd and not lvcp.crowd_light_nodetree:
+            lvcp.crowd_light_nodetree = _find_node_group('LIGHT_CROWD') or build_light_vector_group('CROWD')
+        if self.crowd and not lvcp.crowd_head_nodetree:
+            lvcp.crowd_head_nodetree = _find_node_group('HEAD_CROWD') or build_head_vector_group('CROWD')
 
         self.report({"INFO"}, "Created Light and Head vector node groups.")
         return {"FINISHED"}
 
 
+class LVCP_OT_ConsolidateNodeGroups(Operator):
+    """Merge duplicated LVCP node groups (e.g. 'Light_Vector.001' from appended characters) into one tree each."""
+    bl_idname = "lvcp.consolidate_node_groups"
+    bl_label = "Consolidate Node Groups"
+    bl_options = {"REGISTER", "UNDO"}
+
+    def execute(self, context):
+        removed, kept = consolidate_node_groups(utils.get_LVCP())
+        if kept:
+            self.report({"WARNING"}, f"Kept edited node groups: {', '.join(kept)}")
+        self.report({"INFO"}, f"Merged {removed} duplicate node group(s).")
+        return {"FINISHED"}
+
+
 # region Add Node Groups
 
 
@@ -412,6 +940,135 @@ class LVCP_OT_AddNodeGroupsToMaterial(Operator):
         return context.window_manager.invoke_props_dialog(self)
 
 
+def _ensure_group_node(node_tree, group, location):
+    """The node using 'group' in 'node_tree', added if there is none. Returns (node, added)."""
+    for node in node_tree.nodes:
+        if node.type == 'GROUP' and node.node_tree == group:
+            return node, False
+    node = node_tree.nodes.new(type="ShaderNodeGroup")
+    node.node_tree = group
+    node.location = location
+    return node, True
+
+
+def _wire_outputs(node_tree, group_node):
+    """Connects the group's outputs to unconnected inputs of the same name, e.g. of a toon shader group."""
+    linked = 0
+    for output in group_node.outputs:
+        for node in node_tree.nodes:
+            if node == group_node:
+                continue
+            socket = node.inputs.get(output.name)
+            if socket and not socket.is_linked:
+                node_tree.links.new(socket, output)
+                linked += 1
+    return linked
+
+
+def inject_node_groups(materials, light_group=None, head_group=None):
+    """
+    Adds the LVCP node groups to every material that does not have them yet and wires them.
+    The materials are tagged through the deferred scheduler, so shaders recompile in one batch.
+    Returns (changed materials, added nodes, links).
+    """
+    changed, added, links = 0, 0, 0
+    for mat in materials:
+        node_tree = mat.node_tree
+        output = next((n for n in node_tree.nodes if n.type == 'OUTPUT_MATERIAL'), None)
+        origin = Vector(output.location) - Vector((900, -300)) if output else Vector((0, 0))
+        touched = False
+        for offset, group in enumerate(g for g in (light_group, head_group) if g):
+            node, is_new = _ensure_group_node(node_tree, group, origin - Vector((0, offset * 150)))
+            wired = _wire_outputs(node_tree, node)
+            added += is_new
+            links += wired
+            touched = touched or is_new or wired > 0
+        if touched:
+            changed += 1
+            utils.tags.tag(mat)
+    return changed, added, links
+
+
+class LVCP_OT_InjectNodeGroups(Operator):
+    """Add the LVCP node groups to every material of the linked objects."""
+    bl_idname = "lvcp.inject_node_groups"
+    bl_label = "Add Groups to Linked Materials"
+    bl_options = {"REGISTER", "UNDO"}
+
+    scope: bpy.props.EnumProperty(
+        name="Instances",
+        items=[
+            ('ACTIVE', "Active Instance", "Materials of the objects linked to the active instance"),
+            ('ALL', "All Instances", "Materials of the objects linked to any instance"),
+        ],
+        default='ALL',
+    )
+    bool_add_light: BoolProperty(name="Light Vector", default=True)
+    bool_add_head: BoolProperty(name="Head Vector", default=True)
+
+    @classmethod
+    def poll(cls, context):
+        lvcp = utils.get_LVCP()
+        return len(lvcp.lists) > 0 and (lvcp.light_vector_nodetree or lvcp.head_vector_nodetree)
+
+    def execute(self, context):
+        lvcp = utils.get_LVCP()
+        items = list(lvcp.lists) if self.scope == 'ALL' else [lvcp.list] if lvcp.list is not None else []
+        flat = lvcp.flatten_vectors and lvcp.flat_light_nodetree and lvcp.flat_head_nodetree
+
+        # Instances using their own light get the standard light group instead of the global one
+        materials_by_tree = {}
+        for item in items:
+            if flat:
+                # The flat vectors already carry the global light where it applies
+                light_tree = lvcp.flat_light_nodetree
+            elif lvcp.global_light and lvcp.global_light_nodetree and not item.light_override:
+                light_tree = lvcp.global_light_nodetree
+            else:
+                light_tree = lvcp.light_vector_nodetree
+            materials_by_tree.setdefault(light_tree, []).extend(utils.get_objects_with_lvcp(item))
+        head_tree = lvcp.flat_head_nodetree if flat else lvcp.head_vector_nodetree
+
+        changed, added, links, total = 0, 0, 0, 0
+        for light_tree, objects in materials_by_tree.items():
+            materials = utils.materials_of_objects(objects)
+            light_group = light_tree if self.bool_add_light else None
+            head_group = head_tree if self.bool_add_head else None
+            result = inject_node_groups(materials, light_group, head_group)
+            changed, added, links = changed + result[0], added + result[1], links + result[2]
+            total += len(materials)
+        if not total:
+            self.report({"WARNING"}, "The linked objects have no node materials.")
+            return {'CANCELLED'}
+        self.report({"INFO"}, f"Updated {changed} of {total} material(s): {added} node(s) added, {links} link(s).")
+        return {"FINISHED"}
+
+    def invoke(self, context, _event):
+        return context.window_manager.invoke_props_dialog(self)
+
+
+class LVCP_OT_InjectCrowdNodeGroups(Operator):
+    """Add the crowd node groups to every material of the crowd collection."""
+    bl_idname = "lvcp.inject_crowd_node_groups"
+    bl_label = "Add Crowd Groups to Materials"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        lvcp = utils.get_LVCP()
+        return lvcp.crowd_collection and lvcp.crowd_light_nodetree and lvcp.crowd_head_nodetree
+
+    def execute(self, context):
+        lvcp = utils.get_LVCP()
+        materials = utils.materials_of_objects(lvcp.crowd_collection.all_objects)
+        if not materials:
+            self.report({"WARNING"}, "The crowd collection has no node materials.")
+            return {'CANCELLED'}
+        changed, added, links = inject_node_groups(materials, lvcp.crowd_light_nodetree, lvcp.crowd_head_nodetree)
+        self.report({"INFO"}, f"Updated {changed} of {len(materials)} material(s): {added} node(s) added, {links} link(s).")
+        return {"FINISHED"}
+
+
 # region Coll Mgmt
 
 
@@ -478,13 +1135,21 @@ class LVCP_OT_DeleteNodeGroups(Operator):
     bl_label = "Delete Node Groups"
     bl_options = {"REGISTER", "UNDO"}
 
+    @classmethod
+    def poll(cls, context):
+        lvcp = utils.get_LVCP()
+        return any(getattr(lvcp, attr) for attr in _NODE_GROUP_POINTERS.values())
+
     def execute(self, context):
         lvcp = utils.get_LVCP()
-        if lvcp.light_vector_nodetree:
-            bpy.data.node_groups.remove(lvcp.light_vector_nodetree)
-        if lvcp.head_vector_nodetree:
-            bpy.data.node_groups.remove(lvcp.head_vector_nodetree)
-        self.report({"INFO"}, "Deleted LVCP node groups.")
+        trees = {}
+        for attr in _NODE_GROUP_POINTERS.values():
+            tree = getattr(lvcp, attr)
+            if tree:
+                trees[tree.as_pointer()] = tree
+            setattr(lvcp, attr, None)
+        bpy.data.batch_remove(list(trees.values()))
+        self.report({"INFO"}, f"Deleted {len(trees)} LVCP node groups.")
         return {"FINISHED"}
 
 
@@ -502,12 +1167,31 @@ class LVCP_OT_RestoreDriver(Operator):
 
     def execute(self, context):
         lvcp_list = utils.get_LVCP().list
-        lvcp_list.update_light_group(context)
-        lvcp_list.set_driver_head()
+        if lvcp_list.drivers_valid():
+            self.report({"INFO"}, f"Drivers of '{lvcp_list.name}' are up to date.")
+            return {"FINISHED"}
+        lvcp_list.rebuild_drivers(context)
         self.report({"INFO"}, f"Restored drivers for '{lvcp_list.name}'.")
         return {"FINISHED"}
 
 
+class LVCP_OT_CheckIntegrity(Operator):
+    """Validate the pointers and drivers of every LVCP instance."""
+    bl_idname = "lvcp.check_integrity"
+    bl_label = "Check Instances"
+    bl_options = {"REGISTER", "UNDO"}
+
+    repair: BoolProperty(name="Repair", description="Repair the broken instances", default=False)
+
+    def execute(self, context):
+        report = properties.check_instances(utils.get_LVCP(), context, self.repair)
+        if not report["broken"]:
+            self.report({"INFO"}, f"All {report['checked']} instance(s) are intact.")
+        else:
+            self.report({"WARNING"}, f"{len(report['broken'])} of {report['checked']} instance(s) broken, {report['repaired']} repaired.")
+        return {"FINISHED"}
+
+
 # region Add Light Empty
 
 
@@ -528,11 +1212,7 @@ class LVCP_OT_AddLightEmpty(Operator):
         empty = utils.add_empty(f"Light_Direction_{lvcp_list.name}_{idx}", 0.5, "SINGLE_ARROW", (0, 0, 0))
         empty.rotation_euler.x = radians(-90)
         utils.add_custom_prop(empty, utils.Constants.OBJECT_PROP_LIGHT, [0.0, 0.0, 0.0])
-        utils.set_drivers(
-            target_context=empty, prop_name=utils.Constants.OBJECT_PROP_LIGHT,
-            expression="var0", obs=[empty],
-            path1="matrix_world", path2="[2]", path3="index"
-        )
+        utils.set_light_empty_driver(empty)
         lvcp_root.light_collection.objects.link(empty)
         lvcp_list.light_group.objects.link(empty)
         lvcp_list.update_light_group(context)
@@ -540,6 +1220,445 @@ class LVCP_OT_AddLightEmpty(Operator):
         return {"FINISHED"}
 
 
+# region Light Rig Presets
+
+
+def apply_light_rig(context, items, rig, replace=True):
+    """
+    Builds the light empties of 'rig' in the light groups of 'items'. Instances sharing a
+    group fill it once, and each group's master driver is rebuilt once at the end instead
+    of once per added light. Returns the number of created empties.
+    """
+    lvcp_root = utils.get_LVCP()
+    groups = {}
+    for item in items:
+        if item.light_group:
+            groups.setdefault(item.light_group.as_pointer(), item)
+
+    if replace:
+        old = {}
+        for item in groups.values():
+            old.update((obj.as_pointer(), obj) for obj in item.light_group.objects if utils.Constants.OBJECT_PROP_LIGHT in obj)
+        bpy.data.batch_remove(list(old.values()))
+
+    created = 0
+    for item in groups.values():
+        group = item.light_group
+        first = len(group.objects)
+        for i, light in enumerate(rig["lights"]):
+            empty = utils.add_empty(f"Light_Direction_{item.name}_{first + i}", light.get("size", 0.5), "SINGLE_ARROW", (0, 0, 0))
+            empty.rotation_euler = light["rotation"]
+            utils.add_custom_prop(empty, utils.Constants.OBJECT_PROP_LIGHT, [0.0, 0.0, 0.0])
+            lvcp_root.light_collection.objects.link(empty)
+            group.objects.link(empty)
+            created += 1
+        # Builds the master driver and the empties' drivers in one pass
+        item.update_light_group(context)
+        if replace and group.objects:
+            item.active_light = group.objects[0]
+    return created
+
+
+class LVCP_OT_SaveLightRig(Operator, ExportHelper):
+    bl_idname = "lvcp.save_light_rig"
+    bl_label = "Save Light Rig"
+    bl_description = "Save the light empties of the active instance's light group as a preset"
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        lvcp_list = utils.get_LVCP().list
+        return lvcp_list and lvcp_list.light_group
+
+    def execute(self, context):
+        group = utils.get_LVCP().list.light_group
+        rig = serialization.light_rig_from_group(group)
+        try:
+            serialization.write_document(self.filepath, rig)
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not write light rig: {e}")
+            return {'CANCELLED'}
+        self.report({"INFO"}, f"Saved {len(rig['lights'])} lights of '{group.name}' to '{self.filepath}'.")
+        return {"FINISHED"}
+
+
+class LVCP_OT_ApplyLightRig(Operator, ImportHelper):
+    bl_idname = "lvcp.apply_light_rig"
+    bl_label = "Apply Light Rig"
+    bl_description = "Build the light empties of a light rig preset in the light groups of one or more instances"
+    bl_options = {"REGISTER", "UNDO"}
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+    target: bpy.props.EnumProperty(
+        name="Apply To",
+        items=[
+            ('ACTIVE', "Active Instance", "Apply to the active instance"),
+            ('SELECTED', "Selected Instances", "Apply to every instance owning or linked to a selected object"),
+            ('ALL', "All Instances", "Apply to every instance"),
+        ],
+        default='ACTIVE',
+    )
+    replace: BoolProperty(name="Replace Lights", description="Remove the existing light empties of the groups first", default=True)
+
+    @classmethod
+    def poll(cls, context):
+        return len(utils.get_LVCP().lists) > 0
+
+    def execute(self, context):
+        try:
+            rig = serialization.read_light_rig(self.filepath)
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Could not read light rig: {e}")
+            return {'CANCELLED'}
+
+        lvcp = utils.get_LVCP()
+        if self.target == 'ALL':
+            items = list(lvcp.lists)
+        elif self.target == 'SELECTED':
+            items = [lvcp.lists[i] for i in _instances_of_objects(lvcp, context.selected_objects)]
+        else:
+            items = [lvcp.list] if lvcp.list is not None else []
+        items = [item for item in items if item.light_group]
+        if not items:
+            self.report({"WARNING"}, "No instance with a light group to apply the rig to.")
+            return {'CANCELLED'}
+
+        created = apply_light_rig(context, items, rig, self.replace)
+        self.report({"INFO"}, f"Created {created} light empties for {len(items)} instance(s).")
+        return {"FINISHED"}
+
+
+# region Scene Spec
+
+
+def build_from_spec(context, spec, replace=True, reporter=None):
+    """
+    Rebuilds the LVCP configuration described by a scene spec in one pass: existing instances
+    are removed with a single batch_remove, settings are applied before any driver is built,
+    all instances are created in one batch (see setup_instances) with shared light groups built
+    once, and baked instances are re-baked over their recorded range at the end.
+    Returns (created instances, missing object names).
+    """
+    reporter = reporter or _LogReporter()
+    lvcp, _created = utils.ensure_initial_collections()
+    if replace and len(lvcp.lists):
+        delete_instances(range(len(lvcp.lists)))
+
+    settings = spec.get("settings", {})
+    # Before the evaluation mode, which reads the cache when switched to it
+    for key in ("cache_path", "scrub_debounce"):
+        if key in settings:
+            setattr(lvcp, key, settings[key])
+    if settings.get("scrub_selection") in {item.identifier for item in lvcp.bl_rna.properties["scrub_selection"].enum_items}:
+        lvcp.scrub_selection = settings["scrub_selection"]
+    if "packed_light_threshold" in settings:
+        lvcp.packed_light_threshold = settings["packed_light_threshold"]
+    if settings.get("eval_mode") in {item.identifier for item in lvcp.bl_rna.properties["eval_mode"].enum_items}:
+        lvcp.eval_mode = settings["eval_mode"]
+
+    node_groups = spec.get("node_groups", {})
+    if node_groups.get("light"):
+        lvcp.light_vector_nodetree = bpy.data.node_groups.get(node_groups["light"])
+    if node_groups.get("head"):
+        lvcp.head_vector_nodetree = bpy.data.node_groups.get(node_groups["head"])
+    for key, prop in (("global_light", "global_light_nodetree"), ("flat_light", "flat_light_nodetree"), ("flat_head", "flat_head_nodetree"),
+                      ("crowd_light", "crowd_light_nodetree"), ("crowd_head", "crowd_head_nodetree")):
+        if node_groups.get(key):
+            setattr(lvcp, prop, bpy.data.node_groups.get(node_groups[key]))
+
+    # Instances naming the same light group share one group, built once with the first of them
+    existing = utils.get_instances_by_collection_name(lvcp)
+    instances, setups, missing = [], [], []
+    for instance in spec["instances"]:
+        base_name = serialization.strip_suffix(instance["base_name"])
+        if f"LVCP_{base_name}" in existing:
+            reporter.report({"WARNING"}, f"LVCP instance for '{base_name}' already exists, skipped.")
+            continue
+        armature = bpy.data.objects.get(instance.get("armature") or "")
+        if instance.get("armature") and armature is None:
+            missing.append(instance["armature"])
+        instances.append(instance)
+        setups.append(InstanceSetup(
+            instance.get("name", base_name), base_name, armature, instance.get("bone", "") if armature else "",
+            instance.get("lights"), instance.get("light_group"),
+        ))
+
+    created, bakes = [], {}
+    with utils.tags.deferred():
+        items, _seconds = setup_instances(reporter, context, setups)
+        for instance, setup, item in zip(instances, setups, items):
+            head_location = instance.get("head_location")
+            if head_location and setup.armature is None:
+                item.collection[utils.Constants.COLLECTION_PROP_O].location = head_location
+            if instance.get("active_light_index", 0) != item.active_light_index:
+                item.active_light_index = instance["active_light_index"]
+
+            for name in instance.get("linked_objects", []):
+                obj = bpy.data.objects.get(name)
+                if obj is None:
+                    missing.append(name)
+                    continue
+                utils.link_object(obj, item.collection)
+                utils.tags.tag_data(obj)
+            item.sync_linked_objects()
+            if instance.get("light_override"):
+                item.light_override = True
+            bake = instance.get("bake")
+            if bake:
+                key = (bake["frame_start"], bake["frame_end"], bake.get("step", 1), bake.get("mute", True))
+                bakes.setdefault(key, []).append(item)
+            created.append(item)
+
+    # The source instance exists now
+    if "global_light" in settings:
+        lvcp.global_light_source = settings.get("global_light_source", "")
+        lvcp.global_light = settings["global_light"]
+    if settings.get("flatten_vectors"):
+        lvcp.flatten_vectors = True
+    crowd_collection = bpy.data.collections.get(settings.get("crowd_collection") or "")
+    if crowd_collection:
+        lvcp.crowd_collection = crowd_collection
+        lvcp.crowd_source = settings.get("crowd_source", "")
+        lvcp.crowd_mode = settings.get("crowd_mode", False)
+    elif settings.get("crowd_collection"):
+        missing.append(settings["crowd_collection"])
+
+    # Baked instances are re-baked once everything they depend on exists, one pass per frame range
+    for (frame_start, frame_end, step, mute), items in bakes.items():
+        evaluation.bake_instances(context.scene, items, frame_start, frame_end, step, mute)
+    return created, missing
+
+
+class LVCP_OT_ExportSceneSpec(Operator, ExportHelper):
+    bl_idname = "lvcp.export_scene_spec"
+    bl_label = "Export Scene Spec"
+    bl_description = "Write the whole LVCP configuration of the scene to a JSON file"
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        spec = serialization.scene_spec_from_lvcp(utils.get_LVCP())
+        try:
+            serialization.write_document(self.filepath, spec, indent=2)
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not write scene spec: {e}")
+            return {'CANCELLED'}
+        self.report({"INFO"}, f"Exported {len(spec['instances'])} instance(s) to '{self.filepath}'.")
+        return {"FINISHED"}
+
+
+class LVCP_OT_ImportSceneSpec(Operator, ImportHelper):
+    bl_idname = "lvcp.import_scene_spec"
+    bl_label = "Import Scene Spec"
+    bl_description = "Rebuild the LVCP configuration of the scene from a JSON file"
+    bl_options = {"REGISTER", "UNDO"}
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+    replace: BoolProperty(name="Replace Instances", description="Delete the existing instances first", default=True)
+
+    def execute(self, context):
+        try:
+            spec = serialization.read_scene_spec(self.filepath)
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Could not read scene spec: {e}")
+            return {'CANCELLED'}
+
+        start = time.perf_counter()
+        created, missing = build_from_spec(context, spec, self.replace, reporter=self)
+        if missing:
+            self.report({"WARNING"}, f"Missing objects: {', '.join(sorted(set(missing)))}")
+        self.report({"INFO"}, f"Built {len(created)} instance(s) in {time.perf_counter() - start:.3f}s.")
+        return {"FINISHED"}
+
+
+# region Bake Vectors
+
+
+class LVCP_OT_BakeVectors(Operator):
+    """Bake the light and head vectors to keyframes so playback and rendering need no drivers."""
+    bl_idname = "lvcp.bake_vectors"
+    bl_label = "Bake Vectors"
+    bl_options = {"REGISTER", "UNDO"}
+
+    frame_start: IntProperty(name="Start Frame", default=1)
+    frame_end: IntProperty(name="End Frame", default=250)
+    step: IntProperty(name="Step", default=1, min=1)
+    all_instances: BoolProperty(name="All Instances", description="Bake every instance instead of only the active one", default=True)
+    mute_drivers: BoolProperty(name="Mute Drivers", description="Mute the drivers so the baked keyframes are used", default=True)
+
+    @classmethod
+    def poll(cls, context):
+        return len(utils.get_LVCP().lists) > 0
+
+    def execute(self, context):
+        if self.frame_end < self.frame_start:
+            self.report({"ERROR"}, "End frame must not be before the start frame.")
+            return {'CANCELLED'}
+        lvcp = utils.get_LVCP()
+        items = list(lvcp.lists) if self.all_instances else [lvcp.list]
+
+        start = time.perf_counter()
+        frames = evaluation.bake_instances(context.scene, items, self.frame_start, self.frame_end, self.step, self.mute_drivers)
+        self.report({"INFO"}, f"Baked {len(items)} instance(s) over {frames} frames in {time.perf_counter() - start:.2f}s.")
+        return {"FINISHED"}
+
+    def invoke(self, context, _event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+
+class LVCP_OT_ClearBake(Operator):
+    """Remove baked vector keyframes and restore the drivers."""
+    bl_idname = "lvcp.clear_bake"
+    bl_label = "Clear Bake"
+    bl_options = {"REGISTER", "UNDO"}
+
+    all_instances: BoolProperty(name="All Instances", default=True)
+
+    @classmethod
+    def poll(cls, context):
+        return any(item.is_baked for item in utils.get_LVCP().lists)
+
+    def execute(self, context):
+        lvcp = utils.get_LVCP()
+        items = [item for item in (lvcp.lists if self.all_instances else [lvcp.list]) if item.is_baked]
+        evaluation.clear_bake(items)
+        self.report({"INFO"}, f"Cleared bake of {len(items)} instance(s).")
+        return {"FINISHED"}
+
+
+# region Vector Cache
+
+
+class LVCP_OT_WriteVectorCache(Operator):
+    """Write the vectors of all instances over a frame range to the vector cache file."""
+    bl_idname = "lvcp.write_vector_cache"
+    bl_label = "Write Vector Cache"
+
+    frame_start: IntProperty(name="Start Frame", default=1)
+    frame_end: IntProperty(name="End Frame", default=250)
+    step: IntProperty(name="Step", default=1, min=1)
+
+    @classmethod
+    def poll(cls, context):
+        lvcp = utils.get_LVCP()
+        return len(lvcp.lists) > 0 and lvcp.cache_path
+
+    def execute(self, context):
+        if self.frame_end < self.frame_start:
+            self.report({"ERROR"}, "End frame must not be before the start frame.")
+            return {'CANCELLED'}
+        lvcp = utils.get_LVCP()
+        try:
+            frames = evaluation.write_cache(lvcp.cache_path, context.scene, lvcp.lists, self.frame_start, self.frame_end, self.step)
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not write vector cache: {e}")
+            return {'CANCELLED'}
+        self.report({"INFO"}, f"Wrote {frames} frames of {len(lvcp.lists)} instance(s) to '{lvcp.cache_path}'.")
+        return {"FINISHED"}
+
+    def invoke(self, context, _event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+
+# region Profiler
+
+
+class LVCP_OT_ProfilerReset(Operator):
+    bl_idname = "lvcp.profiler_reset"
+    bl_label = "Reset Profiler"
+    bl_description = "Clear all collected profiling counters"
+
+    def execute(self, context):
+        profiler.session.reset()
+        return {"FINISHED"}
+
+
+class LVCP_OT_ProfilerExport(Operator, ExportHelper):
+    bl_idname = "lvcp.profiler_export"
+    bl_label = "Export Profile"
+    bl_description = "Write the collected profiling counters to a JSON file"
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        try:
+            profiler.session.export(self.filepath)
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not write profile: {e}")
+            return {'CANCELLED'}
+        self.report({"INFO"}, f"Exported profile to '{self.filepath}'.")
+        return {"FINISHED"}
+
+
+class LVCP_OT_RecordTrace(Operator, ExportHelper):
+    bl_idname = "lvcp.record_trace"
+    bl_label = "Record Trace"
+    bl_description = "Play a frame range and export a Chrome trace of the LVCP evaluation timeline"
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+    frame_start: IntProperty(name="Start Frame", default=-1, description="-1 uses the scene range")
+    frame_end: IntProperty(name="End Frame", default=-1, description="-1 uses the scene range")
+
+    def execute(self, context):
+        scene = context.scene
+        frame_start = scene.frame_start if self.frame_start < 0 else self.frame_start
+        frame_end = scene.frame_end if self.frame_end < 0 else self.frame_end
+        try:
+            events = profiler.record_trace(scene, frame_start, frame_end, self.filepath)
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not write trace: {e}")
+            return {'CANCELLED'}
+        self.report({"INFO"}, f"Recorded {events} events over frames {frame_start}-{frame_end} to '{self.filepath}'.")
+        return {"FINISHED"}
+
+
+# region Armature Profiles
+
+
+class LVCP_OT_AddArmatureProfile(Operator):
+    bl_idname = "lvcp.add_armature_profile"
+    bl_label = "Add Armature Profile"
+    bl_description = "Add an Auto-Setup naming profile"
+
+    def execute(self, context):
+        prefs = utils.get_preferences()
+        if prefs is None:
+            self.report({"ERROR"}, "Add-on preferences are not available.")
+            return {'CANCELLED'}
+        profile = prefs.armature_profiles.add()
+        _name, profile.armature_pattern, profile.head_bone, profile.mesh_names = utils.Constants.DEFAULT_ARMATURE_PROFILE
+        profile.name = f"Profile {len(prefs.armature_profiles)}"
+        utils.armature_index.invalidate()
+        return {"FINISHED"}
+
+
+class LVCP_OT_RemoveArmatureProfile(Operator):
+    bl_idname = "lvcp.remove_armature_profile"
+    bl_label = "Remove Armature Profile"
+    bl_description = "Remove this Auto-Setup naming profile"
+
+    index: IntProperty()
+
+    def execute(self, context):
+        prefs = utils.get_preferences()
+        if prefs is None or not 0 <= self.index < len(prefs.armature_profiles):
+            return {'CANCELLED'}
+        prefs.armature_profiles.remove(self.index)
+        utils.armature_index.invalidate()
+        return {"FINISHED"}
+
+
 # region Registration 
 
 
@@ -547,21 +1666,41 @@ classes = (
     LVCP_OT_CreateInstance,
     LVCP_OT_DeleteInstance,
     LVCP_OT_AutoSetupForArmature,
+    LVCP_OT_AutoSetupAll,
+    LVCP_OT_SetupFromTemplate,
     LVCP_OT_LinkObjects,
     LVCP_OT_UnlinkObjects,
     LVCP_OT_CreateNodeGroups,
+    LVCP_OT_ConsolidateNodeGroups,
     LVCP_OT_AddNodeGroupsToMaterial,
+    LVCP_OT_InjectNodeGroups,
+    LVCP_OT_InjectCrowdNodeGroups,
     LVCP_OT_CollectionManager,
     LVCP_OT_SelectEmpty,
     LVCP_OT_SelectObject,
     LVCP_OT_DeleteNodeGroups,
     LVCP_OT_RestoreDriver,
+    LVCP_OT_CheckIntegrity,
     LVCP_OT_AddLightEmpty,
+    LVCP_OT_SaveLightRig,
+    LVCP_OT_ApplyLightRig,
+    LVCP_OT_ExportSceneSpec,
+    LVCP_OT_ImportSceneSpec,
+    LVCP_OT_BakeVectors,
+    LVCP_OT_ClearBake,
+    LVCP_OT_WriteVectorCache,
+    LVCP_OT_ProfilerReset,
+    LVCP_OT_ProfilerExport,
+    LVCP_OT_RecordTrace,
+    LVCP_OT_AddArmatureProfile,
+    LVCP_OT_RemoveArmatureProfile,
 )
 
 
 def register():
     for cls in classes:
+        utils.defer_tags(cls)
+        profiler.instrument_operator(cls)
         bpy.utils.register_class(cls)
 
 
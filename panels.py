@@ -2,6 +2,9 @@ import bpy
 import re
 from bpy.types import Panel, UIList
 from . import utils
+from . import evaluation
+from . import properties
+from . import profiler
 
 
 # region UI List Class
@@ -13,13 +16,42 @@ class LVCP_UL_List_Panel(UIList):
         row = layout.row(align=True)
         row.prop(item, "name", text="", emboss=False, icon="OUTLINER_COLLECTION")
         
-        obj_count = len(utils.get_objects_with_lvcp(item))
-        row.label(text=f"{obj_count} obj", icon="OBJECT_DATA")
+        row.label(text=f"{len(item.linked_objects)} obj", icon="OBJECT_DATA")
         
         light_group_name = item.light_group.name if item.light_group else "No Group"
         row.label(text=f"{light_group_name}", icon="LIGHT")
 
 
+class LVCP_UL_Linked_Objects(UIList):
+    """The objects linked to an instance. Only visible rows are drawn; filtering and sorting use the object names."""
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        obj = item.object
+        row = layout.row(align=True)
+        row.label(text=obj.name if obj else item.name, icon="OBJECT_DATA" if obj else "ERROR")
+        if obj:
+            op = row.operator("lvcp.unlink_objects", icon="X", text="", emboss=False)
+            op.obj_name = obj.name
+
+    def filter_items(self, context, data, propname):
+        entries = getattr(data, propname)
+        names = [entry.object.name if entry.object else "" for entry in entries]
+
+        flags = [self.bitflag_filter_item] * len(names)
+        pattern = self.filter_name.lower()
+        for i, name in enumerate(names):
+            # Entries of deleted objects stay hidden until the next resync
+            if not name or (pattern and pattern not in name.lower()):
+                flags[i] = 0
+
+        order = []
+        if self.use_filter_sort_alpha:
+            ranking = sorted(range(len(names)), key=lambda i: names[i].lower())
+            order = [0] * len(names)
+            for position, i in enumerate(ranking):
+                order[i] = position
+        return flags, order
+
+
 # region Panels
 
 
@@ -68,45 +100,40 @@ class LVCP_PT_Main_Panel(LVCP_PT_Panel_Base, Panel):
 
     def draw_setup_tab(self, layout, context):
         # Auto-detect suitable armature for quick setup
-        found_armatures = utils.find_suitable_armatures(context)
-
-        if found_armatures:
-            lvcp = utils.get_LVCP()
-            for armature in found_armatures:
-                # Check if an instance already exists for this armature
-                base_name = utils.get_base_name_from_armature(armature.name)
-                existing_instance = False
-                for item in lvcp.lists:
-                    if item.collection and item.collection.name == f"LVCP_{base_name}":
-                        existing_instance = True
-                        break
-
-                if not existing_instance:
-                    op = layout.operator("lvcp.auto_setup_for_armature", text=f"Setup {armature.name}")
-                    op.armature_name = armature.name
+        candidates = utils.armature_index.candidates(context.scene)
+
+        if candidates:
+            instances = utils.get_instances_by_collection_name(utils.get_LVCP())
+            # Check if an instance already exists for this armature
+            pending = [c for c in candidates if f"LVCP_{c.base_name}" not in instances]
+            if len(pending) > 1:
+                layout.operator("lvcp.auto_setup_all", icon="ARMATURE_DATA", text=f"Setup All ({len(pending)})")
+            prefs = utils.get_preferences()
+            if pending and prefs and prefs.template_library:
+                layout.operator("lvcp.setup_from_template", icon="ASSET_MANAGER", text=f"Setup from Template ({len(pending)})")
+            for candidate in pending:
+                op = layout.operator("lvcp.auto_setup_for_armature", text=f"Setup {candidate.name}")
+                op.armature_name = candidate.name
 
         row = layout.row(align=True)
         row.operator("lvcp.link_objects", icon="LINKED", text="Link Selected")
         row.operator("lvcp.select_object", icon="RESTRICT_SELECT_OFF", text="Select Linked")
 
         lvcp_list = utils.get_LVCP().list
-        linked_objs = utils.get_objects_with_lvcp(lvcp_list)
+        if lvcp_list is None:
+            return
+        if lvcp_list.linked_objects_stale():
+            # Objects were linked, removed or duplicated outside the operators
+            properties.schedule_linked_objects_sync()
 
         layout.separator()
 
-        if not linked_objs:
+        if not lvcp_list.linked_objects:
             layout.label(text="No objects linked.", icon="INFO")
         else:
             # Show count of linked objects
-            layout.label(text=f"{len(linked_objs)} linked object(s)", icon="INFO")
-            
-            # Display objects in a box for better visual grouping
-            obj_box = layout.box()
-            for obj in linked_objs:
-                row = obj_box.row(align=True)
-                row.label(text=obj.name, icon="OBJECT_DATA")
-                op = row.operator("lvcp.unlink_objects", icon="X", text="")
-                op.obj_name = obj.name
+            layout.label(text=f"{len(lvcp_list.linked_objects)} linked object(s)", icon="INFO")
+            layout.template_list("LVCP_UL_Linked_Objects", "", lvcp_list, "linked_objects", lvcp_list, "linked_objects_index", rows=5)
 
     def draw_lighting_tab(self, layout, context):
         active_lvcp = utils.get_LVCP().list
@@ -126,22 +153,76 @@ class LVCP_PT_Main_Panel(LVCP_PT_Panel_Base, Panel):
         row = layout.row()
         row.prop_search(active_lvcp, "active_light", active_lvcp.light_group, "objects", text="Active")
         
+        lvcp = utils.get_LVCP()
+        box = layout.box()
+        box.prop(lvcp, "global_light")
+        if lvcp.global_light:
+            box.prop_search(lvcp, "global_light_source", lvcp, "lists", text="Source")
+            box.prop(active_lvcp, "light_override")
+
         row = layout.row()
         row.operator("lvcp.add_light_empty", icon="LIGHT", text="Add Light")
         row.prop(active_lvcp, "active_light_index", slider=True, text="Index")
 
+        row = layout.row(align=True)
+        row.operator("lvcp.save_light_rig", icon="EXPORT", text="Save Rig")
+        row.operator("lvcp.apply_light_rig", icon="IMPORT", text="Apply Rig")
+
     def draw_nodes_tab(self, layout, context):
         lvcp = utils.get_LVCP()
         layout.prop(lvcp, "light_vector_nodetree", text="")
         layout.prop(lvcp, "head_vector_nodetree", text="")
+        if lvcp.global_light:
+            layout.prop(lvcp, "global_light_nodetree", text="")
+        layout.prop(lvcp, "flatten_vectors")
+        if lvcp.flatten_vectors:
+            layout.prop(lvcp, "flat_light_nodetree", text="")
+            layout.prop(lvcp, "flat_head_nodetree", text="")
+        if lvcp.crowd_mode:
+            layout.prop(lvcp, "crowd_light_nodetree", text="")
+            layout.prop(lvcp, "crowd_head_nodetree", text="")
         row = layout.row(align=True)
-        row.operator("lvcp.create_node_groups", icon="NODE", text="Create")
+        op = row.operator("lvcp.create_node_groups", icon="NODE", text="Create")
+        op.global_light = lvcp.global_light
+        op.flat = lvcp.flatten_vectors
+        op.crowd = lvcp.crowd_mode
         row.operator("lvcp.delete_node_groups", icon="X", text="Delete")
+        row.operator("lvcp.consolidate_node_groups", icon="AUTOMERGE_ON", text="")
+        layout.operator("lvcp.inject_node_groups", icon="MATERIAL", text="Add to Linked Materials")
+        if lvcp.crowd_mode:
+            layout.operator("lvcp.inject_crowd_node_groups", icon="MATERIAL", text="Add to Crowd Materials")
 
     def draw_advanced_tab(self, layout, context):
         active_lvcp = utils.get_LVCP().list
 
+        lvcp = utils.get_LVCP()
+        layout.prop(lvcp, "eval_mode")
+        layout.prop(lvcp, "packed_light_threshold")
+        box = layout.box()
+        box.prop(lvcp, "crowd_mode")
+        if lvcp.crowd_mode:
+            box.prop(lvcp, "crowd_collection")
+            box.prop_search(lvcp, "crowd_source", lvcp, "lists", text="Source")
+            count = evaluation.crowd_index.cached_count(context.scene, lvcp.crowd_collection) if lvcp.crowd_collection else None
+            if count is not None:
+                box.label(text=f"{count} instance(s)", icon="OUTLINER_OB_GROUP_INSTANCE")
+        row = layout.row(align=True)
+        row.prop(lvcp, "scrub_debounce")
+        row.prop(lvcp, "scrub_selection", text="")
+        row = layout.row(align=True)
+        row.prop(lvcp, "cache_path", text="")
+        row.operator("lvcp.write_vector_cache", icon="FILE_CACHE", text="")
         layout.operator("lvcp.restore_driver", icon="DRIVER", text="Restore Drivers")
+        self.draw_integrity(layout, lvcp)
+        row = layout.row(align=True)
+        row.operator("lvcp.export_scene_spec", icon="EXPORT", text="Export Spec")
+        row.operator("lvcp.import_scene_spec", icon="IMPORT", text="Import Spec")
+
+        row = layout.row(align=True)
+        row.operator("lvcp.bake_vectors", icon="REC", text="Bake")
+        row.operator("lvcp.clear_bake", icon="X", text="Clear Bake")
+        if active_lvcp and active_lvcp.is_baked:
+            layout.label(text="Active instance plays back baked keyframes.", icon="KEYTYPE_KEYFRAME_VEC")
 
         box = layout.box()
         box.label(text="Driver Output Vectors")
@@ -169,6 +250,54 @@ class LVCP_PT_Main_Panel(LVCP_PT_Panel_Base, Panel):
         else:
             col.label(text="Up: N/A", icon="ERROR")
 
+        self.draw_profiler(layout, lvcp)
+
+    def draw_integrity(self, layout, lvcp):
+        box = layout.box()
+        row = box.row(align=True)
+        row.prop(lvcp, "check_on_load")
+        row.operator("lvcp.check_integrity", icon="VIEWZOOM", text="").repair = False
+        row.operator("lvcp.check_integrity", icon="TOOL_SETTINGS", text="").repair = True
+
+        report = properties.integrity_report
+        if not report["checked"]:
+            return
+        if not report["broken"]:
+            box.label(text=f"{report['checked']} instance(s) intact ({report['seconds'] * 1000:.1f} ms).", icon="CHECKMARK")
+            return
+        box.label(text=f"{len(report['broken'])} broken, {report['repaired']} repaired.", icon="ERROR")
+        for entry in report["broken"]:
+            icon = "CHECKMARK" if entry["repaired"] else "ERROR"
+            box.label(text=f"{entry['instance']}: {'; '.join(entry['problems'])}", icon=icon)
+
+    def draw_profiler(self, layout, lvcp):
+        box = layout.box()
+        row = box.row(align=True)
+        row.prop(lvcp, "profiling", icon="TIME")
+        row.operator("lvcp.profiler_reset", icon="FILE_REFRESH", text="")
+        row.operator("lvcp.profiler_export", icon="EXPORT", text="")
+        row.operator("lvcp.record_trace", icon="SEQ_HISTOGRAM", text="")
+        session = profiler.session
+        if not session.stats:
+            box.label(text="No samples collected.", icon="INFO")
+            return
+
+        box.label(text=f"Frames: {session.frames}")
+        col = box.column(align=True)
+        for name, stat in sorted(session.stats.items(), key=lambda kv: -kv[1].total)[:12]:
+            row = col.row()
+            row.label(text=name)
+            per_frame = session.calls_per_frame(name)
+            calls = f"{stat.calls} ({per_frame:.1f}/f)" if session.frames else f"{stat.calls}"
+            row.label(text=calls)
+            row.label(text=f"{stat.total * 1000.0:.2f} ms")
+
+        if session.cascades:
+            box.label(text="Cascades")
+            col = box.column(align=True)
+            for (caller, callee), count in sorted(session.cascades.items(), key=lambda kv: -kv[1])[:8]:
+                col.label(text=f"{caller} -> {callee}: {count}")
+
 
 # region Node Editor Helper
 
@@ -190,6 +319,7 @@ class LVCP_PT_NodeEditor_Panel(Panel):
 
 classes = (
     LVCP_UL_List_Panel,
+    LVCP_UL_Linked_Objects,
     LVCP_PT_Main_Panel,
     LVCP_PT_NodeEditor_Panel,
 )
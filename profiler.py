@@ -0,0 +1,281 @@
+# Lightweight counters and timers for operators, driver callbacks and property updates
+
+import bpy
+import functools
+import json
+import os
+import threading
+import time
+from bpy.app.handlers import persistent
+from . import utils
+
+
+# region Profiler
+
+
+class Stat:
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "total_ms": self.total * 1000.0,
+            "mean_us": self.total / self.calls * 1e6 if self.calls else 0.0,
+            "max_us": self.max * 1e6,
+        }
+
+
+class Profiler:
+    """
+    Collects call counts and timings per instrumented name, plus which instrumented
+    calls happened inside which (cascades). Everything is a no-op while disabled.
+    """
+
+    MAX_TRACE_EVENTS = 1_000_000
+
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+        self.cascades = {}      # (caller, callee) -> count
+        self.frames = 0
+        self._stack = []
+        self.tracing = False
+        self.events = []        # Chrome trace events, recorded only while tracing
+        self._trace_start = 0.0
+
+    def reset(self):
+        self.stats.clear()
+        self.cascades.clear()
+        self.frames = 0
+        self._stack.clear()
+        self.events.clear()
+
+    def call(self, name, func, args, kwargs, trace_args=None):
+        if self._stack:
+            key = (self._stack[-1], name)
+            self.cascades[key] = self.cascades.get(key, 0) + 1
+        self._stack.append(name)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat()
+            stat.calls += 1
+            stat.total += elapsed
+            if elapsed > stat.max:
+                stat.max = elapsed
+            if self.tracing:
+                self.add_event(name, start, elapsed, trace_args)
+
+    def start_trace(self):
+        self.events.clear()
+        self._trace_start = time.perf_counter()
+        self.tracing = True
+
+    def stop_trace(self):
+        self.tracing = False
+
+    def add_event(self, name, start, elapsed, args=None, category="lvcp"):
+        """Adds a complete ('X') event; timestamps are microseconds since the trace started."""
+        if len(self.events) >= self.MAX_TRACE_EVENTS:
+            return
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._trace_start) * 1e6,
+            "dur": elapsed * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def span(self, name, func, *args, category="lvcp", trace_args=None):
+        """Runs 'func' as a traced span even if it is not instrumented itself."""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            if self.tracing:
+                self.add_event(name, start, time.perf_counter() - start, trace_args, category)
+
+    def export_trace(self, filepath, metadata=None):
+        with open(filepath, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms", "metadata": metadata or {}}, f)
+
+    def calls_per_frame(self, name):
+        stat = self.stats.get(name)
+        return stat.calls / self.frames if stat and self.frames else 0.0
+
+    def report(self):
+        return {
+            "frames": self.frames,
+            "stats": {name: stat.as_dict() for name, stat in sorted(self.stats.items())},
+            "calls_per_frame": {name: self.calls_per_frame(name) for name in sorted(self.stats)},
+            "cascades": [
+                {"caller": caller, "callee": callee, "count": count}
+                for (caller, callee), count in sorted(self.cascades.items(), key=lambda kv: -kv[1])
+            ],
+        }
+
+    def export(self, filepath):
+        with open(filepath, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+session = Profiler()
+
+
+# region Instrumentation
+
+
+def profiled(name):
+    """Decorator recording calls of 'func' under 'name'. Disabled, it costs one attribute check."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not session.enabled:
+                return func(*args, **kwargs)
+            return session.call(name, func, args, kwargs)
+        wrapper.lvcp_profiled = True
+        return wrapper
+    return decorator
+
+
+def profiled_callback(name):
+    """
+    Like profiled, for (self, context) callbacks. Blender checks the argument count of
+    property update functions and operator methods, so the signature is kept explicit.
+    Traces name the LVCP instance ('self.name') the callback ran for.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, context):
+            if not session.enabled:
+                return func(self, context)
+            trace_args = {"instance": getattr(self, "name", "")} if session.tracing else None
+            return session.call(name, func, (self, context), {}, trace_args)
+        wrapper.lvcp_profiled = True
+        return wrapper
+    return decorator
+
+
+def instrument_operator(cls):
+    """Wraps an operator's execute once, before the class is registered."""
+    if not getattr(cls.execute, "lvcp_profiled", False):
+        cls.execute = profiled_callback(f"{cls.__name__}.execute")(cls.execute)
+    return cls
+
+
+# Driver callbacks run many times per frame, so they are only swapped for
+# instrumented versions while profiling and cost nothing otherwise.
+_driver_functions = {
+    utils.Constants.DRIVER_FUNCTION: utils.lvcp_driver_func,
+    utils.Constants.DRIVER_PACKED_FUNCTION: utils.lvcp_packed_driver_func,
+}
+
+
+# Trace arguments per driver function: the light master, the light index and the light group size
+_driver_trace_args = {
+    utils.Constants.DRIVER_FUNCTION: lambda idx, values, owner="": {"instance": owner, "idx": idx, "lights": len(values)},
+    utils.Constants.DRIVER_PACKED_FUNCTION: lambda values, idx, component, owner="": {"instance": owner, "idx": idx, "lights": len(values) // 3},
+}
+
+
+def _profiled_driver_function(name, func):
+    trace_args = _driver_trace_args[name]
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        if not session.enabled:
+            return func(*args)
+        return session.call(name, func, args, {}, trace_args(*args) if session.tracing else None)
+    return wrapper
+
+
+_profiled_driver_functions = {name: _profiled_driver_function(name, func) for name, func in _driver_functions.items()}
+
+
+@persistent
+def frame_change_post_handler(scene, depsgraph=None):
+    session.frames += 1
+
+
+def set_enabled(enabled):
+    session.enabled = enabled
+    functions = _profiled_driver_functions if enabled else _driver_functions
+    for name, func in functions.items():
+        bpy.app.driver_namespace[name] = func
+
+    handlers = bpy.app.handlers.frame_change_post
+    if enabled and frame_change_post_handler not in handlers:
+        handlers.append(frame_change_post_handler)
+    elif not enabled and frame_change_post_handler in handlers:
+        handlers.remove(frame_change_post_handler)
+
+
+def record_trace(scene, frame_start, frame_end, filepath):
+    """
+    Plays 'scene' through a frame range with profiling and tracing on and writes a
+    Chrome trace (chrome://tracing, Perfetto). Works headless, e.g.
+    blender -b shot.blend --python-expr "import bpy; bpy.ops.lvcp.record_trace(filepath='/tmp/lvcp.json')"
+    Returns the number of recorded events.
+    """
+    was_enabled = session.enabled
+    frame_current = scene.frame_current
+    set_enabled(True)
+    session.start_trace()
+    try:
+        # Start from a clean driver namespace like a freshly loaded file, then swap in the instrumented functions
+        session.span("utils.load_post_handler", utils.load_post_handler, None, category="setup")
+        session.span("profiler.set_enabled", set_enabled, True, category="setup")
+        for frame in range(frame_start, frame_end + 1):
+            session.span(f"Frame {frame}", scene.frame_set, frame, category="frame", trace_args={"frame": frame})
+    finally:
+        session.stop_trace()
+        scene.frame_set(frame_current)
+        set_enabled(was_enabled)
+
+    session.export_trace(filepath, {
+        "blend_file": bpy.data.filepath,
+        "scene": scene.name,
+        "frame_start": frame_start,
+        "frame_end": frame_end,
+        "blender_version": bpy.app.version_string,
+        "instances": len(scene.LVCP.lists),
+        "eval_mode": scene.LVCP.eval_mode,
+    })
+    return len(session.events)
+
+
+@persistent
+def load_post_handler(dummy):
+    # The loaded scene decides; utils' load handler has already installed the plain driver functions
+    lvcp = getattr(bpy.context.scene, "LVCP", None)
+    set_enabled(bool(lvcp and lvcp.profiling))
+
+
+# region Registration
+
+
+def register():
+    if load_post_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(load_post_handler)
+
+
+def unregister():
+    set_enabled(False)
+    if load_post_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(load_post_handler)
+    # utils.unregister removes the driver functions afterwards
@@ -1,9 +1,17 @@
 
 
 import bpy
-from bpy.props import StringProperty, BoolProperty, IntProperty, PointerProperty, CollectionProperty
-from bpy.types import PropertyGroup, Collection, Object, NodeTree
+import logging
+import time
+from bpy.app.handlers import persistent
+from bpy.props import StringProperty, BoolProperty, IntProperty, FloatProperty, PointerProperty, CollectionProperty
+from bpy.types import PropertyGroup, AddonPreferences, Collection, Object, NodeTree
 from . import utils
+from . import evaluation
+from . import profiler
+
+
+log = logging.getLogger(__name__)
 
 
 # region Light Group
@@ -13,6 +21,123 @@ class LVCP_LightGroup(PropertyGroup):
     collection: PointerProperty(type=Collection)
 
 
+# region Preferences
+
+
+def update_armature_profile(self, context):
+    utils.armature_index.invalidate()
+
+
+class LVCP_ArmatureProfile(PropertyGroup):
+    """Naming rule used by Auto-Setup to recognise character armatures."""
+    name: StringProperty(name="Name", default="Profile")
+    enabled: BoolProperty(name="Enabled", default=True, update=update_armature_profile)
+    armature_pattern: StringProperty(
+        name="Armature Pattern",
+        description="Regular expression matched against armature names. A group named 'base' (or the first group) becomes the instance name",
+        update=update_armature_profile,
+    )
+    head_bone: StringProperty(name="Head Bone", description="Bone the head origin is parented to", update=update_armature_profile)
+    mesh_names: StringProperty(name="Meshes", description="Comma separated names of child meshes to link automatically", update=update_armature_profile)
+
+
+class LVCP_Preferences(AddonPreferences):
+    bl_idname = __package__
+
+    armature_profiles: CollectionProperty(type=LVCP_ArmatureProfile)
+    template_library: StringProperty(
+        name="Template Library",
+        description=".blend file with a pre-built LVCP instance used by 'Setup from Template'",
+        subtype='FILE_PATH',
+    )
+    template_collection: StringProperty(
+        name="Template Collection",
+        description="Name of the LVCP instance collection in the template library",
+        default="LVCP_Template",
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.label(text="Auto-Setup Profiles")
+        if not self.armature_profiles:
+            layout.label(text="No profiles, using the built-in 'Art_/Avatar_' rule with 'Head_M'.", icon="INFO")
+        for i, profile in enumerate(self.armature_profiles):
+            box = layout.box()
+            row = box.row(align=True)
+            row.prop(profile, "enabled", text="")
+            row.prop(profile, "name", text="")
+            row.operator("lvcp.remove_armature_profile", icon="X", text="").index = i
+            box.prop(profile, "armature_pattern")
+            box.prop(profile, "head_bone")
+            box.prop(profile, "mesh_names")
+        layout.operator("lvcp.add_armature_profile", icon="ADD")
+
+        layout.separator()
+        layout.label(text="Instance Template")
+        layout.prop(self, "template_library")
+        layout.prop(self, "template_collection")
+
+
+# region Linked Objects
+
+
+class LVCP_LinkedObject(PropertyGroup):
+    """Mirror entry of a mesh linked to an instance, so the UI list draws only its visible rows."""
+    object: PointerProperty(type=Object)
+
+
+def _sync_linked_objects_timer():
+    # The membership index only covers the active scene, other scenes keep their mirror until shown
+    lvcp = getattr(bpy.context.scene, "LVCP", None)
+    for item in lvcp.lists if lvcp is not None else []:
+        item.sync_linked_objects()
+    return None
+
+
+def schedule_linked_objects_sync():
+    """Resyncs the active scene's linked object mirrors outside of drawing, where ID data may not be written."""
+    if not bpy.app.timers.is_registered(_sync_linked_objects_timer):
+        bpy.app.timers.register(_sync_linked_objects_timer, first_interval=0.0)
+
+
+# region Light Index Scrubbing
+
+
+# (scene name, instance path) -> name of the light that was selected before the scrub started
+_pending_scrubs = {}
+_scrub_deadline = 0.0
+
+
+def _scrub_timer():
+    """Applies the final light index of every scrubbed instance once the slider has been still long enough."""
+    remaining = _scrub_deadline - time.monotonic()
+    if remaining > 0.0:
+        return remaining
+
+    pending = dict(_pending_scrubs)
+    _pending_scrubs.clear()
+    for (scene_name, path), previous_name in pending.items():
+        scene = bpy.data.scenes.get(scene_name)
+        if scene is None:
+            continue
+        try:
+            item = scene.path_resolve(path)
+        except ValueError:
+            continue  # The instance was removed while scrubbing
+        item.apply_light_index(scene.LVCP.scrub_selection, bpy.data.objects.get(previous_name))
+    return None
+
+
+def schedule_scrub(item, previous_light, delay):
+    global _scrub_deadline
+    key = (item.id_data.name, item.path_from_id())
+    if key not in _pending_scrubs:
+        _pending_scrubs[key] = previous_light.name if previous_light else ""
+    _scrub_deadline = time.monotonic() + delay
+    if not bpy.app.timers.is_registered(_scrub_timer):
+        bpy.app.timers.register(_scrub_timer, first_interval=delay)
+
+
 # region LVCP List Main
 
 
@@ -25,24 +150,37 @@ class LVCP_List_Main(PropertyGroup):
     name: StringProperty()
     collection: PointerProperty(type=Collection, name="LVCP Collection", description="Collection for this LVCP instance.")
     light_master: PointerProperty(type=Object, name="Light Master", description="Empty that holds the final light vector.")
+    is_baked: BoolProperty(name="Baked", description="The vectors are played back from baked keyframes", default=False)
+
+    def update_light_override(self, context):
+        """
+        Swaps the global light group for the standard one in the materials of the linked objects, so the
+        shared global group stays a single scene attribute read. Materials shared with other instances follow the last change.
+        """
+        lvcp = self.id_data.LVCP
+        if self.collection and evaluation.is_flat_mode(self.id_data):
+            evaluation.propagate_flat_vectors(self.id_data, [self])
+        if not self.collection or not lvcp.global_light_nodetree or not lvcp.light_vector_nodetree:
+            return
+        old_group, new_group = lvcp.global_light_nodetree, lvcp.light_vector_nodetree
+        if not self.light_override:
+            old_group, new_group = new_group, old_group
+        utils.replace_node_group(utils.materials_of_objects(utils.get_objects_with_lvcp(self)), old_group, new_group)
+
+    light_override: BoolProperty(
+        name="Own Light",
+        description="Use this instance's light instead of the global light; its materials get the standard light group",
+        default=False,
+        update=update_light_override,
+    )
     
+    @profiler.profiled_callback("LVCP_List_Main.update_light_group")
     def update_light_group(self, context):
         """Called when the light_group collection is changed."""
         self.light_master = self.light_group.get(utils.Constants.COLLECTION_PROP_MASTER) if self.light_group else None
         if not self.light_master: return
 
-        utils.del_drivers(self.light_master, utils.Constants.OBJECT_PROP_LIGHT)
-        objects = self.light_group.objects if self.light_group else []
-        if objects:
-            utils.set_drivers(
-                target_context=self.light_master,
-                prop_name=utils.Constants.OBJECT_PROP_LIGHT,
-                expression=f'{utils.Constants.DRIVER_FUNCTION}(self["idx"],[{self._make_lights_arg_string()}])',
-                obs=objects,
-                path1=f'["{utils.Constants.OBJECT_PROP_LIGHT}"]',
-                path2="index",
-                path3="",
-            )
+        self.set_driver_light_master()
         
         # This will trigger the index update function, which now contains all the necessary logic.
         self.active_light_index = self.active_light_index 
@@ -56,6 +194,7 @@ class LVCP_List_Main(PropertyGroup):
                     self.collection.children.unlink(c)
             utils.link_collection(self.collection, self.light_group)
 
+    @profiler.profiled_callback("LVCP_List_Main.update_active_light")
     def update_active_light(self, context):
         """Called when the 'Active Light' dropdown is changed by the user."""
         if self.get("_is_updating"): return
@@ -70,6 +209,7 @@ class LVCP_List_Main(PropertyGroup):
         except (AttributeError, ValueError):
             pass
     
+    @profiler.profiled_callback("LVCP_List_Main.update_active_light_index")
     def update_active_light_index(self, context):
         """Called when the 'Light Index' slider is changed by the user."""
         if self.get("_is_updating"): return
@@ -88,19 +228,36 @@ class LVCP_List_Main(PropertyGroup):
             # This is safe to ignore if the UI data isn't ready. The clamping below still ensures correctness.
             pass
         
-        if self.light_master:
-            self.light_master["idx"] = clamped_value
-            self.light_master.update_tag()
+        # IMPORTANT: Write the clamped value back to the property before it is published. This must be done inside the guard.
+        self.active_light_index = clamped_value
 
+        lvcp = self.id_data.LVCP
+        previous_light = self.active_light
         if objects and clamped_value < len(objects):
             self.active_light = objects[clamped_value]
-            utils.select_object(objects[clamped_value].name)
-        
-        # IMPORTANT: Write the clamped value back to the property. This must be done inside the guard.
-        self.active_light_index = clamped_value
+
+        if lvcp.scrub_debounce > 0.0:
+            # Coalesce slider ticks; only the last value is tagged and selected
+            schedule_scrub(self, previous_light, lvcp.scrub_debounce)
+        else:
+            self.apply_light_index(lvcp.scrub_selection, previous_light)
 
         self["_is_updating"] = False
 
+    def apply_light_index(self, selection, previous_light=None):
+        """Pushes the active light index to the light master and updates the selection."""
+        if self.light_master:
+            self.light_master["idx"] = self.active_light_index
+            utils.tags.tag(self.light_master)
+
+        light = self.active_light
+        if not light:
+            return
+        if selection == 'EXCLUSIVE':
+            utils.select_object(light.name)
+        elif selection == 'INCREMENTAL':
+            utils.move_selection(previous_light, light)
+
     # Define the properties that control the active light
     light_group: PointerProperty(type=Collection, update=update_light_group)
     
@@ -115,29 +272,198 @@ class LVCP_List_Main(PropertyGroup):
         name="Light Index",
         description="Index of the active light control empty. Changing this updates the active light and vice-versa.",
         min=0,
-        max=3,
         update=update_active_light_index,
     )
 
+    linked_objects: CollectionProperty(type=LVCP_LinkedObject)
+    linked_objects_index: IntProperty(name="Linked Object", default=0)
+
+    def sync_linked_objects(self):
+        """Mirrors the objects linked to this instance into 'linked_objects'. Returns True if it changed."""
+        objects = utils.get_objects_with_lvcp(self)
+        entries = self.linked_objects
+        if len(entries) == len(objects) and all(e.object == obj and e.name == obj.name for e, obj in zip(entries, objects)):
+            return False
+        entries.clear()
+        for obj in objects:
+            entry = entries.add()
+            entry.name = obj.name
+            entry.object = obj
+        return True
+
+    def linked_objects_stale(self):
+        """Cheap check for the panels: the cached object count disagrees with the mirror."""
+        return len(self.linked_objects) != utils.count_objects_with_lvcp(self)
+
     def _make_lights_arg_string(self):
         objects = self.light_group.objects if self.light_group else []
         return ",".join([f"var{i}" for i in range(len(objects))])
 
-    def set_driver_head(self):
-        head_origin = self.collection.get(utils.Constants.COLLECTION_PROP_O)
+    def _light_master_driver_args(self):
+        """
+        set_drivers arguments for the light master's index-select driver, or None if it should have none.
+        In simple expression mode the light empties' matrices are read directly, so neither 'self' nor Python is needed.
+        Python drivers pass the master's name, which only the profiler's trace uses.
+        """
+        objects = self.light_group.objects if self.light_group else []
+        if not objects or not utils.drivers_enabled(): return None
 
-        if not head_origin: return
+        if self.uses_packed_lights():
+            # One Python driver per component that only reads the selected light from the packed array
+            return dict(
+                target_context=self.light_master,
+                prop_name=utils.Constants.OBJECT_PROP_LIGHT,
+                expression=[
+                    f'{utils.Constants.DRIVER_PACKED_FUNCTION}(self["{utils.Constants.OBJECT_PROP_LIGHTS_PACKED}"],self["idx"],{i},self.name)'
+                    for i in range(3)
+                ],
+                obs=[],
+            )
+
+        if utils.simple_drivers_enabled():
+            matrix_paths = dict(path1="matrix_world", path2="[2]", path3="index")
+            expression = utils.make_select_expression(len(objects))
+            if expression:
+                return dict(
+                    target_context=self.light_master,
+                    prop_name=utils.Constants.OBJECT_PROP_LIGHT,
+                    expression=expression,
+                    obs=objects,
+                    use_self=False,
+                    extra_vars=[(utils.Constants.DRIVER_INDEX_VAR, self.light_master, '["idx"]')],
+                    **matrix_paths,
+                )
+        else:
+            matrix_paths = dict(path1=f'["{utils.Constants.OBJECT_PROP_LIGHT}"]', path2="index", path3="")
+
+        # Python fallback for small groups
+        return dict(
+            target_context=self.light_master,
+            prop_name=utils.Constants.OBJECT_PROP_LIGHT,
+            expression=f'{utils.Constants.DRIVER_FUNCTION}(self["idx"],[{self._make_lights_arg_string()}],self.name)',
+            obs=objects,
+            **matrix_paths,
+        )
+
+    def _head_driver_args(self, head_origin):
+        """set_drivers arguments for the head origin's front and up drivers, or (None, None)."""
+        if not utils.drivers_enabled(): return None, None
 
-        utils.del_drivers(head_origin, utils.Constants.OBJECT_PROP_FRONT)
-        utils.del_drivers(head_origin, utils.Constants.OBJECT_PROP_UP)
-        utils.set_drivers(
+        # 'self' is never needed here; leaving it off keeps these simple expressions in simple mode
+        use_self = not utils.simple_drivers_enabled()
+        front = dict(
             target_context=head_origin, prop_name=utils.Constants.OBJECT_PROP_FRONT,
-            expression="-var0", obs=[head_origin], path1="matrix_world", path2="[1]", path3="index"
+            expression="-var0", obs=[head_origin], path1="matrix_world", path2="[1]", path3="index", use_self=use_self
         )
-        utils.set_drivers(
+        up = dict(
             target_context=head_origin, prop_name=utils.Constants.OBJECT_PROP_UP,
-            expression="var0", obs=[head_origin], path1="matrix_world", path2="[2]", path3="index"
+            expression="var0", obs=[head_origin], path1="matrix_world", path2="[2]", path3="index", use_self=use_self
         )
+        return front, up
+
+    def uses_packed_lights(self):
+        """
+        Large groups are read from a packed array on the master instead of one driver variable per light:
+        above the scene's threshold with Python drivers, or when a simple expression would not fit into a driver.
+        """
+        count = len(self.light_group.objects) if self.light_group else 0
+        if not count or not utils.drivers_enabled():
+            return False
+        if utils.simple_drivers_enabled():
+            # Simple expression mode must not need Python unless the expression cannot be built
+            return utils.make_select_expression(count) is None
+        return count > utils.get_LVCP().packed_light_threshold
+
+    def pack_light_group(self):
+        """Stores every light vector of the group in one flat array on the master. Returns True if it changed."""
+        if not self.light_master or not self.light_group or not self.light_group.objects:
+            return False
+        packed = evaluation.light_vectors(evaluation.read_matrices(list(self.light_group.objects))).ravel().tolist()
+        current = self.light_master.get(utils.Constants.OBJECT_PROP_LIGHTS_PACKED)
+        if current is not None and len(current) == len(packed) and all(abs(a - b) <= 1e-6 for a, b in zip(current, packed)):
+            return False
+        self.light_master[utils.Constants.OBJECT_PROP_LIGHTS_PACKED] = packed
+        utils.tags.tag(self.light_master)
+        return True
+
+    def _light_empty_driver_args(self, empty):
+        # Packed groups read the empties' matrices when packing, so their own drivers are not needed
+        return None if self.uses_packed_lights() else utils.light_empty_driver_args(empty)
+
+    def set_driver_light_master(self):
+        """
+        Patches the light master's driver in place; adding a light only appends one variable.
+        The light empties' drivers are only touched if they differ, e.g. when a group becomes packed.
+        """
+        evaluation.invalidate_animated_lights(self)
+        if self.uses_packed_lights():
+            self.pack_light_group()
+        elif utils.Constants.OBJECT_PROP_LIGHTS_PACKED in self.light_master:
+            del self.light_master[utils.Constants.OBJECT_PROP_LIGHTS_PACKED]
+        for obj in self.light_group.objects if self.light_group else []:
+            if utils.Constants.OBJECT_PROP_LIGHT in obj:
+                utils.apply_driver_args(obj, utils.Constants.OBJECT_PROP_LIGHT, self._light_empty_driver_args(obj))
+        utils.apply_driver_args(self.light_master, utils.Constants.OBJECT_PROP_LIGHT, self._light_master_driver_args())
+
+    def set_driver_head(self):
+        head_origin = self.collection.get(utils.Constants.COLLECTION_PROP_O)
+
+        if not head_origin: return
+
+        front, up = self._head_driver_args(head_origin)
+        utils.apply_driver_args(head_origin, utils.Constants.OBJECT_PROP_FRONT, front)
+        utils.apply_driver_args(head_origin, utils.Constants.OBJECT_PROP_UP, up)
+
+    def drivers_valid(self):
+        """Cheap read-only check whether rebuild_drivers would change anything."""
+        head_origin = self.collection.get(utils.Constants.COLLECTION_PROP_O) if self.collection else None
+        if not self.light_master or not head_origin:
+            return False
+
+        checks = [(self.light_master, utils.Constants.OBJECT_PROP_LIGHT, self._light_master_driver_args())]
+        checks += zip((head_origin, head_origin), (utils.Constants.OBJECT_PROP_FRONT, utils.Constants.OBJECT_PROP_UP), self._head_driver_args(head_origin))
+        for obj in self.light_group.objects if self.light_group else []:
+            if utils.Constants.OBJECT_PROP_LIGHT in obj:
+                checks.append((obj, utils.Constants.OBJECT_PROP_LIGHT, self._light_empty_driver_args(obj)))
+        return all(utils.driver_args_match(obj, prop_name, args) for obj, prop_name, args in checks)
+
+    def rebuild_drivers(self, context):
+        """Brings every driver of this instance up to date, or removes them all when the handler evaluates the scene."""
+        self.update_light_group(context)
+        self.set_driver_head()
+        if self.is_baked:
+            evaluation.mute_instance_drivers(self, True)
+
+    def check_integrity(self):
+        """
+        Read-only validation of this instance's pointers and drivers. Returns a list of
+        (problem, repairable) tuples; empty when the rig is intact.
+        """
+        if not self.collection:
+            return [("LVCP collection is missing", False)]
+        problems = []
+        group_master = self.light_group.get(utils.Constants.COLLECTION_PROP_MASTER) if self.light_group else None
+        if not self.light_group:
+            problems.append(("no light group assigned", False))
+        elif not group_master:
+            problems.append((f"light group '{self.light_group.name}' has no '{utils.Constants.COLLECTION_PROP_MASTER}'", False))
+        elif self.light_master != group_master:
+            problems.append(("light master does not match the light group", True))
+        if self.collection.get(utils.Constants.COLLECTION_PROP_L) != (group_master or self.light_master):
+            problems.append((f"'{utils.Constants.COLLECTION_PROP_L}' does not point at the light master", True))
+        if not self.collection.get(utils.Constants.COLLECTION_PROP_O):
+            problems.append((f"'{utils.Constants.COLLECTION_PROP_O}' head origin is missing", False))
+        if not problems and not self.drivers_valid():
+            problems.append(("drivers are out of date or broken", True))
+        return problems
+
+    def repair(self, context):
+        """Fixes the repairable problems found by check_integrity."""
+        if self.light_group:
+            master = self.light_group.get(utils.Constants.COLLECTION_PROP_MASTER)
+            if master and self.collection.get(utils.Constants.COLLECTION_PROP_L) != master:
+                self.collection[utils.Constants.COLLECTION_PROP_L] = master
+        self.rebuild_drivers(context)
 
     def get_non_light_objects(self):
         objects = self.light_group.objects if self.light_group else []
@@ -148,6 +474,19 @@ class LVCP_List_Main(PropertyGroup):
 
 
 class LVCP(PropertyGroup):
+    def update_eval_mode(self, context):
+        """Rebuilds every instance's drivers for the new evaluation mode."""
+        use_cache = self.eval_mode == 'CACHE'
+        for item in self.lists:
+            if item.collection:
+                item.rebuild_drivers(context)
+                evaluation.set_head_constraints_muted(item, use_cache)
+        if self.eval_mode == 'HANDLER':
+            evaluation.evaluate_scene(context.scene)
+        elif use_cache:
+            evaluation.apply_cache(context.scene)
+        self.sync_global_light(context)
+
     lists: CollectionProperty(type=LVCP_List_Main)
     light_group: CollectionProperty(type=LVCP_LightGroup)
     lvcp_collection: PointerProperty(type=Collection)
@@ -155,6 +494,92 @@ class LVCP(PropertyGroup):
     idx: IntProperty(name="Index", default=0)
     light_vector_nodetree: PointerProperty(type=NodeTree)
     head_vector_nodetree: PointerProperty(type=NodeTree)
+    global_light_nodetree: PointerProperty(type=NodeTree)
+
+    def global_light_instance(self):
+        """The instance whose light is shared as the global light: the chosen one, else the first."""
+        item = self.lists.get(self.global_light_source) if self.global_light_source else None
+        return item or (self.lists[0] if len(self.lists) else None)
+
+    def sync_global_light(self, context):
+        """Drives the scene's global light vector from the chosen instance, or lets the handler write it."""
+        scene = self.id_data
+        prop = utils.Constants.SCENE_PROP_LIGHT
+        item = self.global_light_instance() if self.global_light else None
+        if item is None or not item.light_master:
+            if utils.has_drivers(scene, prop):
+                utils.del_drivers(scene, prop)
+            if evaluation.is_flat_mode(scene):
+                evaluation.propagate_flat_vectors(scene)
+            return
+        if prop not in scene:
+            scene[prop] = [0.0, 0.0, 1.0]
+        args = None
+        if utils.drivers_enabled():
+            args = dict(
+                target_context=scene, prop_name=prop, expression="var0", obs=[item.light_master],
+                path1=f'["{utils.Constants.OBJECT_PROP_LIGHT}"]', path2="index", path3="", use_self=False,
+            )
+        utils.apply_driver_args(scene, prop, args)
+        if args is None:
+            evaluation.write_global_light(scene)
+        if evaluation.is_flat_mode(scene):
+            evaluation.propagate_flat_vectors(scene)
+
+    def update_flatten_vectors(self, context):
+        if self.flatten_vectors:
+            evaluation.propagate_flat_vectors(self.id_data)
+        else:
+            evaluation.clear_flat_vectors(self.id_data)
+
+    flatten_vectors: BoolProperty(
+        name="Flatten Vectors",
+        description="Copy the final vectors onto every linked object each frame, read by the flat node groups without pointer lookups",
+        default=False,
+        update=update_flatten_vectors,
+    )
+    flat_light_nodetree: PointerProperty(type=NodeTree)
+    flat_head_nodetree: PointerProperty(type=NodeTree)
+
+    def update_crowd(self, context):
+        scene = self.id_data
+        evaluation.crowd_index.invalidate()
+        # The previous collection is already gone here, so every other instancer is cleared
+        evaluation.clear_crowd(scene, self.crowd_collection if self.crowd_mode else None)
+        if self.crowd_mode and self.crowd_collection:
+            evaluation.evaluate_crowd(scene)
+
+    crowd_mode: BoolProperty(
+        name="Crowd",
+        description="Compute head vectors for every instance of the crowd collection from the instancers' transforms",
+        default=False,
+        update=update_crowd,
+    )
+    crowd_collection: PointerProperty(
+        type=Collection,
+        name="Crowd Collection",
+        description="Character collection that is instanced by the crowd",
+        update=update_crowd,
+    )
+    crowd_source: StringProperty(
+        name="Crowd Source",
+        description="LVCP instance of the character inside the crowd collection; its head and light group are shared by the crowd",
+        update=update_crowd,
+    )
+    crowd_light_nodetree: PointerProperty(type=NodeTree)
+    crowd_head_nodetree: PointerProperty(type=NodeTree)
+
+    global_light: BoolProperty(
+        name="Global Light",
+        description="Share one instance's light vector through a scene attribute, read by the global light node group",
+        default=False,
+        update=sync_global_light,
+    )
+    global_light_source: StringProperty(
+        name="Global Light Source",
+        description="Instance whose light is shared. Empty uses the first instance",
+        update=sync_global_light,
+    )
     
     tab: bpy.props.EnumProperty(
         items=[
@@ -166,6 +591,73 @@ class LVCP(PropertyGroup):
         default='SETUP'
     )
 
+    eval_mode: bpy.props.EnumProperty(
+        name="Evaluation",
+        description="How the light and head vectors are evaluated",
+        items=[
+            ('DRIVER', "Python Drivers", "Evaluate the vectors with scripted drivers"),
+            ('SIMPLE', "Simple Expressions", "Build only simple expression drivers, evaluated multithreaded without Python or auto-run scripts"),
+            ('HANDLER', "Batched Handler", "Remove all drivers and evaluate every instance in one batched frame-change/depsgraph handler"),
+            ('CACHE', "Vector Cache", "Remove all drivers, mute the head constraints and read the vectors from a memory-mapped cache file"),
+        ],
+        default='DRIVER',
+        update=update_eval_mode,
+    )
+
+    packed_light_threshold: IntProperty(
+        name="Packed Light Threshold",
+        description="Light groups with more lights than this are read from a packed array, so the per-frame cost does not grow with the group size",
+        default=8,
+        min=1,
+        update=update_eval_mode,
+    )
+
+    scrub_debounce: FloatProperty(
+        name="Scrub Debounce",
+        description="Seconds the light index slider has to rest before the new light is applied. 0 applies every change immediately",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        subtype='TIME_ABSOLUTE',
+    )
+    scrub_selection: bpy.props.EnumProperty(
+        name="Scrub Selection",
+        description="How changing the light index affects the selection",
+        items=[
+            ('EXCLUSIVE', "Select Only", "Deselect everything and select the new light (scans the whole view layer)"),
+            ('INCREMENTAL', "Swap", "Deselect the previous light and select the new one"),
+            ('NONE', "Keep Selection", "Do not change the selection"),
+        ],
+        default='EXCLUSIVE',
+    )
+
+    def update_profiling(self, context):
+        profiler.set_enabled(self.profiling)
+
+    profiling: BoolProperty(
+        name="Profiling",
+        description="Count and time operators, driver callbacks and update callbacks",
+        default=False,
+        update=update_profiling,
+    )
+
+    check_on_load: bpy.props.EnumProperty(
+        name="Check on Load",
+        description="Validate the LVCP rigs when this file is opened",
+        items=[
+            ('OFF', "Off", "Do not check"),
+            ('CHECK', "Check", "Report broken instances"),
+            ('REPAIR', "Repair", "Report and repair broken instances"),
+        ],
+        default='OFF',
+    )
+    cache_path: StringProperty(
+        name="Cache File",
+        description="Vector cache (.npy with a .json header) read in 'Vector Cache' mode",
+        subtype='FILE_PATH',
+        default="//lvcp_vectors.npy",
+    )
+
     @property
     def list(self) -> LVCP_List_Main:
         try:
@@ -183,12 +675,66 @@ class LVCP(PropertyGroup):
             if self.idx >= len(self.lists):
                 self.idx = len(self.lists) - 1
 
+    def remove_lists(self, indices):
+        """Removes several instances at once, keeping the active one selected if it survives."""
+        active = self.idx
+        for i in sorted(set(indices), reverse=True):
+            self.lists.remove(i)
+            if i < active:
+                active -= 1
+        self.idx = max(0, min(active, len(self.lists) - 1))
+
+
+# region Integrity
+
+
+# Result of the last integrity check, shown in the Advanced tab
+integrity_report = {"checked": 0, "broken": [], "repaired": 0, "seconds": 0.0}
+
+
+def check_instances(lvcp, context, repair=False):
+    """Validates every instance and optionally repairs the broken ones. Returns the report."""
+    start = time.perf_counter()
+    broken = []
+    repaired = 0
+    for item in lvcp.lists:
+        problems = item.check_integrity()
+        if not problems:
+            continue
+        fixed = False
+        if repair and all(repairable for _problem, repairable in problems):
+            item.repair(context)
+            fixed = not item.check_integrity()
+            repaired += fixed
+        broken.append({"instance": item.name, "problems": [problem for problem, _repairable in problems], "repaired": fixed})
+
+    integrity_report.update(checked=len(lvcp.lists), broken=broken, repaired=repaired, seconds=time.perf_counter() - start)
+    return integrity_report
+
+
+@persistent
+def load_post_handler(dummy):
+    # Runs after utils' handler, so the driver namespace is installed again
+    context = bpy.context
+    integrity_report.update(checked=0, broken=[], repaired=0, seconds=0.0)
+    lvcp = getattr(context.scene, "LVCP", None)
+    if lvcp is None or lvcp.check_on_load == 'OFF' or not lvcp.lists:
+        return
+    # The report is kept for the Advanced tab; the log only names the broken instances
+    report = check_instances(lvcp, context, repair=lvcp.check_on_load == 'REPAIR')
+    for entry in report["broken"]:
+        state = "repaired" if entry["repaired"] else "broken"
+        log.warning("'%s' %s: %s", entry["instance"], state, "; ".join(entry["problems"]))
+
 
 # region Registration
 
 
 classes = (
+    LVCP_ArmatureProfile,
+    LVCP_Preferences,
     LVCP_LightGroup,
+    LVCP_LinkedObject,
     LVCP_List_Main,
     LVCP,
 )
@@ -197,8 +743,17 @@ classes = (
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+    if load_post_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(load_post_handler)
 
 
 def unregister():
+    if load_post_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(load_post_handler)
+    if bpy.app.timers.is_registered(_scrub_timer):
+        bpy.app.timers.unregister(_scrub_timer)
+    _pending_scrubs.clear()
+    if bpy.app.timers.is_registered(_sync_linked_objects_timer):
+        bpy.app.timers.unregister(_sync_linked_objects_timer)
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
\ No newline at end of file
@@ -0,0 +1,166 @@
+# Reading and writing of LVCP JSON documents. Only converts between data-blocks and plain
+# dicts; creating objects from a document is done by the operators.
+
+import json
+import re
+from . import utils
+
+
+# region Documents
+
+
+LIGHT_RIG = "lvcp_light_rig"
+LIGHT_RIG_VERSION = 1
+SCENE_SPEC = "lvcp_scene"
+SCENE_SPEC_VERSION = 1
+
+
+def read_document(filepath, kind, version):
+    """Loads a JSON document and checks its kind and version. Raises ValueError if it does not match."""
+    with open(filepath) as f:
+        try:
+            document = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Not a JSON file: {e}")
+    if not isinstance(document, dict) or document.get("kind") != kind:
+        raise ValueError(f"Not a '{kind}' document.")
+    if document.get("version", 0) > version:
+        raise ValueError(f"Document version {document.get('version')} is newer than the supported version {version}.")
+    return document
+
+
+def write_document(filepath, document, indent=None):
+    with open(filepath, "w") as f:
+        json.dump(document, f, indent=indent, separators=(",", ":") if indent is None else None)
+
+
+# region Light Rigs
+
+
+def _lights_of_group(light_group):
+    lights = []
+    for obj in light_group.objects:
+        if utils.Constants.OBJECT_PROP_LIGHT not in obj:
+            continue
+        lights.append({
+            "rotation": [round(v, 6) for v in obj.matrix_basis.to_euler('XYZ')],
+            "size": round(obj.empty_display_size, 4),
+        })
+    return lights
+
+
+def light_rig_from_group(light_group):
+    """The light empties of 'light_group' (in group order) as a light rig document."""
+    return {"kind": LIGHT_RIG, "version": LIGHT_RIG_VERSION, "name": light_group.name, "lights": _lights_of_group(light_group)}
+
+
+def _check_lights(lights):
+    for light in lights:
+        rotation = light.get("rotation") if isinstance(light, dict) else None
+        if not isinstance(rotation, list) or len(rotation) != 3:
+            raise ValueError("Every light needs a rotation of three values.")
+
+
+def read_light_rig(filepath):
+    document = read_document(filepath, LIGHT_RIG, LIGHT_RIG_VERSION)
+    lights = document.get("lights")
+    if not isinstance(lights, list) or not lights:
+        raise ValueError("The light rig has no lights.")
+    _check_lights(lights)
+    return document
+
+
+# region Scene Spec
+
+
+def _head_binding(head_origin):
+    """Armature and bone the head origin follows, from its Child Of constraint."""
+    for constraint in head_origin.constraints if head_origin else []:
+        if constraint.type == 'CHILD_OF' and constraint.target:
+            return constraint.target.name, constraint.subtarget
+    return None, ""
+
+
+def strip_suffix(name):
+    """'Bob.001' -> 'Bob': Blender's duplicate suffix is not part of an instance's base name."""
+    return re.sub(r"\.\d{3}$", "", name)
+
+
+def _bake_spec(item):
+    """Frame range, step and driver muting of an instance's baked keyframes, read from its light master."""
+    master = item.light_master
+    anim = master.animation_data if master and item.is_baked else None
+    data_path = f'["{utils.Constants.OBJECT_PROP_LIGHT}"]'
+    fcurve = anim.action.fcurves.find(data_path, index=0) if anim and anim.action else None
+    if fcurve is None or not len(fcurve.keyframe_points):
+        return None
+    points = fcurve.keyframe_points
+    return {
+        "frame_start": int(points[0].co[0]),
+        "frame_end": int(points[-1].co[0]),
+        "step": int(points[1].co[0] - points[0].co[0]) if len(points) > 1 else 1,
+        "mute": any(fc.mute for fc in anim.drivers if fc.data_path == data_path) or not len(anim.drivers),
+    }
+
+
+def instance_spec(item):
+    collection = item.collection
+    head_origin = collection.get(utils.Constants.COLLECTION_PROP_O) if collection else None
+    armature, bone = _head_binding(head_origin)
+    name = strip_suffix(collection.name if collection else item.name)
+    return {
+        "name": item.name,
+        "base_name": name[len("LVCP_"):] if name.startswith("LVCP_") else name,
+        "armature": armature,
+        "bone": bone,
+        "head_location": [round(v, 6) for v in head_origin.location] if head_origin and not armature else None,
+        "light_group": item.light_group.name if item.light_group else None,
+        "lights": _lights_of_group(item.light_group) if item.light_group else [],
+        "active_light_index": item.active_light_index,
+        "light_override": item.light_override,
+        "linked_objects": [obj.name for obj in utils.get_objects_with_lvcp(item)],
+        "bake": _bake_spec(item),
+    }
+
+
+def scene_spec_from_lvcp(lvcp):
+    """The whole LVCP configuration of a scene as one document."""
+    return {
+        "kind": SCENE_SPEC,
+        "version": SCENE_SPEC_VERSION,
+        "settings": {
+            "eval_mode": lvcp.eval_mode,
+            "packed_light_threshold": lvcp.packed_light_threshold,
+            "cache_path": lvcp.cache_path,
+            "scrub_debounce": lvcp.scrub_debounce,
+            "scrub_selection": lvcp.scrub_selection,
+            "global_light": lvcp.global_light,
+            "global_light_source": lvcp.global_light_source,
+            "flatten_vectors": lvcp.flatten_vectors,
+            "crowd_mode": lvcp.crowd_mode,
+            "crowd_collection": lvcp.crowd_collection.name if lvcp.crowd_collection else None,
+            "crowd_source": lvcp.crowd_source,
+        },
+        "node_groups": {
+            "light": lvcp.light_vector_nodetree.name if lvcp.light_vector_nodetree else None,
+            "head": lvcp.head_vector_nodetree.name if lvcp.head_vector_nodetree else None,
+            "global_light": lvcp.global_light_nodetree.name if lvcp.global_light_nodetree else None,
+            "flat_light": lvcp.flat_light_nodetree.name if lvcp.flat_light_nodetree else None,
+            "flat_head": lvcp.flat_head_nodetree.name if lvcp.flat_head_nodetree else None,
+            "crowd_light": lvcp.crowd_light_nodetree.name if lvcp.crowd_light_nodetree else None,
+            "crowd_head": lvcp.crowd_head_nodetree.name if lvcp.crowd_head_nodetree else None,
+        },
+        "instances": [instance_spec(item) for item in lvcp.lists if item.collection],
+    }
+
+
+def read_scene_spec(filepath):
+    document = read_document(filepath, SCENE_SPEC, SCENE_SPEC_VERSION)
+    instances = document.get("instances")
+    if not isinstance(instances, list):
+        raise ValueError("The scene spec has no instance list.")
+    for spec in instances:
+        if not isinstance(spec, dict) or not spec.get("base_name"):
+            raise ValueError("Every instance needs a 'base_name'.")
+        _check_lights(spec.get("lights", []))
+    return document
@@ -2,6 +2,11 @@
 
 import bpy
 import re
+import hashlib
+import functools
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
 from bpy.app.handlers import persistent
 from bpy.types import PropertyGroup
 from mathutils import Vector
@@ -19,11 +24,19 @@ class Constants:
     COLLECTION_PROP_O = "OO"                 # Pointer to the head origin empty
     COLLECTION_PROP_MASTER = "lightMaster"   # Pointer from a LightGroup collection to its master empty
 
+    # Custom properties for Scenes
+    SCENE_PROP_LIGHT = "lvcp_vecLight"       # Global light vector, read by shaders as a View Layer attribute
+
     # Custom properties for Objects
     OBJECT_PROP_COL = "lvcp"                 # Pointer from a mesh to its LVCP collection
     OBJECT_PROP_LIGHT = "vecLight"           # Vector property on light empties and the light master
     OBJECT_PROP_FRONT = "vecFront"           # Vector property on the head origin for forward direction
     OBJECT_PROP_UP = "vecUp"                 # Vector property on the head origin for up direction
+    OBJECT_PROP_LIGHTS_PACKED = "vecLights"  # Flat array of every light vector of a group, stored on the light master
+    # Final vectors copied onto each linked object, so shaders need no pointer lookups
+    OBJECT_PROP_FLAT_LIGHT = "lvcp_vecLight"
+    OBJECT_PROP_FLAT_FRONT = "lvcp_vecFront"
+    OBJECT_PROP_FLAT_UP = "lvcp_vecUp"
     
     # Node Group I/O Names
     NODE_OUTPUT_LIGHT = "Light_Vector"
@@ -32,27 +45,52 @@ class Constants:
     
     # Driver and Naming
     DRIVER_FUNCTION = "lvcp_driver_func"
+    DRIVER_PACKED_FUNCTION = "lvcp_packed_driver_func"
+    DRIVER_INDEX_VAR = "idx"
+    MAX_DRIVER_EXPRESSION = 255              # Blender stores driver expressions in a char[256]
     HEAD_VECTOR_NODE_NAME = "Head_Vector"
+    GLOBAL_LIGHT_NODE_NAME = "Light_Vector_Global"
+    FLAT_LIGHT_NODE_NAME = "Light_Vector_Flat"
+    FLAT_HEAD_NODE_NAME = "Head_Vector_Flat"
+    CROWD_LIGHT_NODE_NAME = "Light_Vector_Crowd"
+    CROWD_HEAD_NODE_NAME = "Head_Vector_Crowd"
+
+    # Stamps on generated node groups, used to find and merge duplicates
+    NODE_GROUP_KIND = "lvcp_kind"            # 'LIGHT', 'HEAD' or a variant such as 'LIGHT_GLOBAL', 'HEAD_FLAT', 'HEAD_CROWD'
+    NODE_GROUP_VERSION = "lvcp_version"
+    NODE_GROUP_HASH = "lvcp_hash"            # Content hash when the group was generated
+    NODE_GROUP_CURRENT_VERSION = 1
+
+    # Auto-Setup naming rules used when no profile is configured in the add-on preferences:
+    # (name, armature pattern with a 'base' group, head bone, comma separated mesh names)
+    DEFAULT_ARMATURE_PROFILE = ("Default", r"^(?:Art|Avatar)_(?P<base>[a-zA-Z]+)(?:_\d{2})?$", "Head_M", "Body,Face,Hair")
 
 
 # region Helper Funcs
 
 
 def find_suitable_armatures(context):
-    """Find armatures that match the pattern and have a Head_M bone."""
-    armature_pattern = re.compile(r"^(Art|Avatar)_[a-zA-Z]+(?:_\d{2})?$")
-    found_armatures = []
-    for obj in context.scene.objects:
-        if obj.type == 'ARMATURE' and armature_pattern.match(obj.name):
-            if 'Head_M' in obj.data.bones:
-                found_armatures.append(obj)
-    return found_armatures
+    """Find armatures that match one of the naming profiles and have its head bone."""
+    return [candidate.armature for candidate in armature_index.candidates(context.scene)]
+
+
+def find_armature_candidate(context, armature_name):
+    """Returns the cached auto-setup candidate for 'armature_name', or None."""
+    for candidate in armature_index.candidates(context.scene):
+        if candidate.name == armature_name:
+            return candidate
+    return None
 
 
 def get_base_name_from_armature(armature_name):
     """Extract the base name from an armature name."""
-    match = re.match(r"^(?:Art|Avatar)_([a-zA-Z]+)(?:_\d{2})?$", armature_name)
-    return match.group(1) if match else armature_name
+    _profile, base_name = match_armature_profile(armature_name)
+    return base_name
+
+
+def get_instances_by_collection_name(lvcp):
+    """Maps LVCP collection names to their instances for constant time 'already set up' checks."""
+    return {item.collection.name: item for item in lvcp.lists if item.collection}
 
 
 def ensure_initial_collections():
@@ -137,47 +175,213 @@ def add_attribute_node(node_tree: bpy.types.NodeTree, name, label, type="OBJECT"
     attrnode.attribute_type = type
     return attrnode
 
+def node_group_hash(node_tree):
+    """Hash of what a node group computes (interface, nodes and links), independent of names and layout."""
+    def node_key(node):
+        return f"{node.bl_idname}:{getattr(node, 'attribute_type', '')}:{getattr(node, 'attribute_name', '')}"
+
+    parts = [f"io:{item.in_out}:{item.socket_type}:{item.name}" for item in node_tree.interface.items_tree if item.item_type == 'SOCKET']
+    parts += sorted(f"node:{node_key(node)}" for node in node_tree.nodes)
+    parts += sorted(
+        f"link:{node_key(link.from_node)}.{link.from_socket.identifier}>{node_key(link.to_node)}.{link.to_socket.identifier}"
+        for link in node_tree.links
+    )
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+def stamp_node_group(node_tree, kind):
+    node_tree[Constants.NODE_GROUP_KIND] = kind
+    node_tree[Constants.NODE_GROUP_VERSION] = Constants.NODE_GROUP_CURRENT_VERSION
+    node_tree[Constants.NODE_GROUP_HASH] = node_group_hash(node_tree)
+
+def node_group_kind(node_tree):
+    """The stamped kind of a generated node group; unstamped groups from older versions are recognised by name."""
+    kind = node_tree.get(Constants.NODE_GROUP_KIND)
+    if kind:
+        return kind
+    base = re.sub(r"\.\d{3}$", "", node_tree.name)
+    return {
+        Constants.NODE_OUTPUT_LIGHT: 'LIGHT',
+        Constants.HEAD_VECTOR_NODE_NAME: 'HEAD',
+        Constants.GLOBAL_LIGHT_NODE_NAME: 'LIGHT_GLOBAL',
+        Constants.FLAT_LIGHT_NODE_NAME: 'LIGHT_FLAT',
+        Constants.FLAT_HEAD_NODE_NAME: 'HEAD_FLAT',
+        Constants.CROWD_LIGHT_NODE_NAME: 'LIGHT_CROWD',
+        Constants.CROWD_HEAD_NODE_NAME: 'HEAD_CROWD',
+    }.get(base)
+
 def edit_property(target_context: PropertyGroup, property_name: str):
     return target_context.id_properties_ui(property_name)
 
 def add_custom_prop(target_context, prop_name, obj):
     target_context[prop_name] = obj
 
-def set_drivers(target_context, prop_name, expression, obs, driver_type="SINGLE_PROP", transform_type="LOC", path1="", path2="", path3=""):
+def _variable_specs(i, obs, driver_type, transform_type, path1, path2, path3, extra_vars):
+    """The (name, type, id, data_path, transform_type) of every variable component 'i' should have."""
+    # Extra variables come first so that appending a light only appends a variable
+    specs = [(name, "SINGLE_PROP", id_block, data_path, None) for name, id_block, data_path in extra_vars]
+    for idx, v in enumerate(obs):
+        if path1:
+            path = path1
+            path += f"[{i}]" if path2 == "index" else path2
+            path += f"[{i}]" if path3 == "index" else path3
+            specs.append((f"var{idx}", driver_type, v, path, None))
+        else:
+            specs.append((f"var{idx}", driver_type, v, None, transform_type + ["_X", "_Y", "_Z"][i]))
+    return specs
+
+def _variable_matches(var, spec):
+    name, var_type, id_block, data_path, transform_type = spec
+    target = var.targets[0]
+    if var.name != name or var.type != var_type or target.id != id_block:
+        return False
+    if data_path is not None:
+        return target.data_path == data_path
+    return target.transform_type == transform_type and target.transform_space == "WORLD_SPACE"
+
+def _apply_variable(var, spec):
+    name, var_type, id_block, data_path, transform_type = spec
+    # Only assign what differs: every target assignment tags a depsgraph relations rebuild
+    if var.name != name: var.name = name
+    if var.type != var_type: var.type = var_type
+    target = var.targets[0]
+    if target.id != id_block: target.id = id_block
+    if data_path is not None:
+        if target.data_path != data_path: target.data_path = data_path
+    else:
+        if target.transform_type != transform_type: target.transform_type = transform_type
+        if target.transform_space != "WORLD_SPACE": target.transform_space = "WORLD_SPACE"
+
+def sync_driver(driver, expression, use_self, specs, apply=True):
+    """
+    Patches 'driver' so it has 'expression' and exactly the variables in 'specs', touching
+    only what differs. With apply=False nothing is changed. Returns True if it differed.
+    """
+    variables = driver.variables
+    changed = driver.expression != expression or driver.use_self != use_self or not driver.is_valid
+    changed = changed or len(variables) != len(specs)
+    if not apply:
+        return changed or not all(_variable_matches(var, spec) for var, spec in zip(variables, specs))
+
+    if driver.expression != expression: driver.expression = expression
+    if driver.use_self != use_self: driver.use_self = use_self
+    while len(variables) > len(specs):
+        variables.remove(variables[len(variables) - 1])
+    for k, spec in enumerate(specs):
+        if k < len(variables):
+            var = variables[k]
+            if _variable_matches(var, spec): continue
+        else:
+            var = variables.new()
+        _apply_variable(var, spec)
+        changed = True
+    if changed:
+        driver.is_valid = True
+    return changed
+
+def _driver_fcurves(target_context, prop_name, create):
+    """The driver F-curves of every component of 'prop_name'. Missing ones are added if 'create', else None."""
     prop_data_path = f'["{prop_name}"]'
-    fcurve = target_context.driver_add(prop_data_path)
-    if not fcurve: return
-    
-    drivers_list = fcurve if isinstance(fcurve, list) else [fcurve.driver]
-    
-    for i, driver in enumerate(drivers_list):
-        if not hasattr(driver, 'driver'): continue
-        driver.driver.expression = expression
-        driver.driver.use_self = True
-        
-        # Clear existing variables before adding new ones
-        for var in list(driver.driver.variables):
-            driver.driver.variables.remove(var)
-
-        for idx, v in enumerate(obs):
-            var = driver.driver.variables.new()
-            var.name = f"var{idx}"
-            var.type = driver_type
-            var.targets[0].id = v
-            if path1:
-                path = path1
-                path += f"[{i}]" if path2 == "index" else path2
-                path += f"[{i}]" if path3 == "index" else path3
-                var.targets[0].data_path = path
-            else:
-                var.targets[0].transform_type = transform_type + ["_X", "_Y", "_Z"][i]
-                var.targets[0].transform_space = "WORLD_SPACE"
-    return fcurve
+    value = target_context.get(prop_name)
+    size = len(value) if hasattr(value, "__len__") else 1
+    anim = target_context.animation_data
+    fcurves = [anim.drivers.find(prop_data_path, index=i) if anim else None for i in range(size)]
+    if create:
+        for i, fcurve in enumerate(fcurves):
+            # Only add missing components, driver_add would reset existing expressions
+            if fcurve is None:
+                fcurves[i] = target_context.driver_add(prop_data_path, i) if size > 1 else target_context.driver_add(prop_data_path)
+    return fcurves
+
+def _component_expression(expression, i):
+    """'expression' may be one string for every component or a sequence with one per component."""
+    return expression if isinstance(expression, str) else expression[i]
+
+def set_drivers(target_context, prop_name, expression, obs, driver_type="SINGLE_PROP", transform_type="LOC", path1="", path2="", path3="", use_self=True, extra_vars=()):
+    """
+    Ensures one driver per component of 'prop_name' with a variable 'var<n>' for every object in 'obs'.
+    'expression' is shared by all components unless a sequence of per-component expressions is given.
+    'extra_vars' is a sequence of (name, id, data_path) single property variables placed before them.
+    Existing drivers are patched in place, so unchanged drivers cause no depsgraph relation rebuild.
+    Simple expression drivers must be built with use_self=False, otherwise Blender falls back to Python.
+    """
+    fcurves = _driver_fcurves(target_context, prop_name, create=True)
+    changed = False
+    for i, fcurve in enumerate(fcurves):
+        if not fcurve: continue
+        specs = _variable_specs(i, obs, driver_type, transform_type, path1, path2, path3, extra_vars)
+        changed |= sync_driver(fcurve.driver, _component_expression(expression, i), use_self, specs)
+    if changed:
+        tags.tag(target_context)
+    return fcurves
+
+def drivers_match(target_context, prop_name, expression, obs, driver_type="SINGLE_PROP", transform_type="LOC", path1="", path2="", path3="", use_self=True, extra_vars=()):
+    """Read-only counterpart of set_drivers: True if the drivers already are exactly what it would build."""
+    fcurves = _driver_fcurves(target_context, prop_name, create=False)
+    for i, fcurve in enumerate(fcurves):
+        if fcurve is None:
+            return False
+        specs = _variable_specs(i, obs, driver_type, transform_type, path1, path2, path3, extra_vars)
+        if sync_driver(fcurve.driver, _component_expression(expression, i), use_self, specs, apply=False):
+            return False
+    return True
+
+def has_drivers(target_context, prop_name):
+    anim = target_context.animation_data
+    prop_data_path = f'["{prop_name}"]'
+    return bool(anim) and any(fcurve.data_path == prop_data_path for fcurve in anim.drivers)
+
+def make_select_expression(count, index_var=Constants.DRIVER_INDEX_VAR):
+    """
+    Builds an index-select that Blender's simple expression evaluator understands,
+    e.g. 'var0*(idx==0)+var1*(idx==1)'. Returns None when it would not fit into a driver expression.
+    """
+    expression = "+".join(f"var{i}*({index_var}=={i})" for i in range(count))
+    if not expression or len(expression) > Constants.MAX_DRIVER_EXPRESSION:
+        return None
+    return expression
+
+def drivers_enabled():
+    """Drivers are only built when the scene is not evaluated by the batched handler or a vector cache."""
+    return get_LVCP().eval_mode not in {'HANDLER', 'CACHE'}
+
+def simple_drivers_enabled():
+    """Whether drivers are generated as simple expressions that need no Python."""
+    return get_LVCP().eval_mode == 'SIMPLE'
+
+def light_empty_driver_args(empty):
+    """
+    set_drivers arguments for a light direction empty's vector, or None if it should have no driver.
+    Simple expression masters read the empty's matrix directly, so no driver is needed there.
+    """
+    if not drivers_enabled() or simple_drivers_enabled(): return None
+    return dict(
+        target_context=empty, prop_name=Constants.OBJECT_PROP_LIGHT,
+        expression="var0", obs=[empty],
+        path1="matrix_world", path2="[2]", path3="index"
+    )
+
+def apply_driver_args(target_context, prop_name, args):
+    """Builds the drivers described by 'args' or removes them when 'args' is None."""
+    if args is None:
+        if has_drivers(target_context, prop_name):
+            del_drivers(target_context, prop_name)
+        return None
+    return set_drivers(**args)
+
+def driver_args_match(target_context, prop_name, args):
+    if args is None:
+        return not has_drivers(target_context, prop_name)
+    return drivers_match(**args)
+
+def set_light_empty_driver(empty):
+    """(Re)creates the driver that feeds a light direction empty's vector from its world matrix."""
+    return apply_driver_args(empty, Constants.OBJECT_PROP_LIGHT, light_empty_driver_args(empty))
 
 def del_drivers(target_context, prop_name):
     try:
         prop_data_path = f'["{prop_name}"]'
         target_context.driver_remove(prop_data_path)
+        tags.tag(target_context)
     except (TypeError, RuntimeError):
         pass # Ignore errors if driver doesn't exist
 
@@ -185,8 +389,49 @@ def has_lvcp(obj, lvcp_list_item):
     return Constants.OBJECT_PROP_COL in obj and obj[Constants.OBJECT_PROP_COL] == lvcp_list_item.collection
 
 def get_objects_with_lvcp(lvcp_list_item):
-    objs = bpy.context.scene.objects
-    return [obj for obj in objs if has_lvcp(obj, lvcp_list_item)]
+    return linked_index.members(lvcp_list_item.collection)
+
+def count_objects_with_lvcp(lvcp_list_item):
+    return linked_index.count(lvcp_list_item.collection)
+
+def materials_of_objects(objects):
+    """Unique local node materials used by 'objects'."""
+    materials = {}
+    for obj in objects:
+        for slot in obj.material_slots:
+            mat = slot.material
+            if mat and mat.use_nodes and mat.node_tree and not mat.library:
+                materials.setdefault(mat.as_pointer(), mat)
+    return list(materials.values())
+
+def replace_node_group(materials, old_group, new_group):
+    """Points every group node using 'old_group' in 'materials' at 'new_group'. Returns the number of changed materials."""
+    changed = 0
+    for mat in materials:
+        nodes = [node for node in mat.node_tree.nodes if node.type == 'GROUP' and node.node_tree == old_group]
+        for node in nodes:
+            node.node_tree = new_group
+        if nodes:
+            changed += 1
+            tags.tag(mat)
+    return changed
+
+def link_object(obj, collection):
+    """Points 'obj' at an LVCP collection and records it in the membership index."""
+    add_custom_prop(obj, Constants.OBJECT_PROP_COL, collection)
+    edit_property(obj, Constants.OBJECT_PROP_COL).update(id_type="COLLECTION")
+    linked_index.link(obj, collection)
+
+def unlink_object(obj):
+    """Removes the LVCP pointer from 'obj'. Returns False if it had none."""
+    if Constants.OBJECT_PROP_COL not in obj:
+        return False
+    del obj[Constants.OBJECT_PROP_COL]
+    for prop_name in (Constants.OBJECT_PROP_FLAT_LIGHT, Constants.OBJECT_PROP_FLAT_FRONT, Constants.OBJECT_PROP_FLAT_UP):
+        if prop_name in obj:
+            del obj[prop_name]
+    linked_index.unlink(obj)
+    return True
 
 def select_object(obj_name):
     for obj_in_scene in bpy.context.view_layer.objects:
@@ -196,7 +441,21 @@ def select_object(obj_name):
         bpy.context.view_layer.objects.active = target_obj
         target_obj.select_set(True)
     
-def lvcp_driver_func(idx, values):
+def move_selection(previous_obj, obj):
+    """Selects 'obj' in place of 'previous_obj' without touching the rest of the view layer."""
+    if previous_obj and previous_obj != obj:
+        try:
+            previous_obj.select_set(False)
+        except RuntimeError:
+            pass  # Not in the view layer
+    if obj:
+        try:
+            obj.select_set(True)
+            bpy.context.view_layer.objects.active = obj
+        except RuntimeError:
+            pass
+
+def lvcp_driver_func(idx, values, owner=""):
     if not values:
         # If the list is empty, return a default Vector.
         return Vector((0.0, 0.0, 1.0))
@@ -209,25 +468,364 @@ def lvcp_driver_func(idx, values):
     
     return 0.0
 
+def is_structural_update(depsgraph):
+    """
+    True when an update may have added, removed or relinked objects, i.e. changed collection
+    membership. Property writes (including this add-on's handlers), transforms and geometry edits
+    are ignored; the indices also compare object counts and the link helpers keep them current.
+    """
+    return depsgraph.id_type_updated('COLLECTION')
+
+
+# region Armature Profiles
+
+
+ArmatureProfile = namedtuple("ArmatureProfile", "name pattern head_bone mesh_names")
+ArmatureCandidate = namedtuple("ArmatureCandidate", "armature name base_name profile")
+
+
+def get_preferences():
+    addon = bpy.context.preferences.addons.get(__package__)
+    return addon.preferences if addon else None
+
+@lru_cache(maxsize=None)
+def _compile_pattern(pattern):
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+def get_armature_profiles():
+    """The enabled naming profiles from the preferences, or the built-in default."""
+    prefs = get_preferences()
+    if prefs and len(prefs.armature_profiles):
+        source = [(p.name, p.armature_pattern, p.head_bone, p.mesh_names) for p in prefs.armature_profiles if p.enabled]
+    else:
+        source = [Constants.DEFAULT_ARMATURE_PROFILE]
+
+    profiles = []
+    for name, pattern, head_bone, mesh_names in source:
+        compiled = _compile_pattern(pattern)
+        if compiled is None:
+            continue # Skip invalid user patterns
+        meshes = frozenset(n.strip() for n in mesh_names.split(",") if n.strip())
+        profiles.append(ArmatureProfile(name, compiled, head_bone, meshes))
+    return profiles
+
+def match_armature_profile(armature_name, profiles=None):
+    """Returns (profile, base_name) of the first matching profile, or (None, armature_name)."""
+    for profile in profiles if profiles is not None else get_armature_profiles():
+        match = profile.pattern.match(armature_name)
+        if not match:
+            continue
+        if "base" in profile.pattern.groupindex:
+            return profile, match.group("base")
+        return profile, match.group(1) if profile.pattern.groups else armature_name
+    return None, armature_name
+
+
+class ArmatureIndex:
+    """
+    Caches the auto-setup candidates of each scene. The cache is dropped on load, undo
+    and structural updates, and is also rebuilt when the number of objects/armatures
+    changes or a cached armature was renamed or removed.
+    """
+
+    def __init__(self):
+        self._cache = {}    # scene pointer -> (signature, candidates)
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def candidates(self, scene):
+        key = scene.as_pointer()
+        signature = (len(bpy.data.objects), len(bpy.data.armatures))
+        cached = self._cache.get(key)
+        if cached and cached[0] == signature and self._is_current(cached[1]):
+            return cached[1]
+        candidates = self._scan(scene)
+        self._cache[key] = (signature, candidates)
+        return candidates
+
+    @staticmethod
+    def _is_current(candidates):
+        try:
+            return all(c.armature.name == c.name for c in candidates)
+        except ReferenceError:
+            return False
+
+    @staticmethod
+    def _scan(scene):
+        profiles = get_armature_profiles()
+        candidates = []
+        for obj in scene.objects:
+            if obj.type != 'ARMATURE':
+                continue
+            profile, base_name = match_armature_profile(obj.name, profiles)
+            if profile and profile.head_bone in obj.data.bones:
+                candidates.append(ArmatureCandidate(obj, obj.name, base_name, profile))
+        return candidates
+
+
+armature_index = ArmatureIndex()
+
+
+# region Linked Object Index
+
+
+class LinkedObjectIndex:
+    """
+    Maps each LVCP collection to the objects whose 'lvcp' pointer targets it, so the
+    UI can answer counts in O(1) and member lists in O(k) instead of scanning the scene.
+    Maintained by the link/unlink helpers and rebuilt lazily after invalidation.
+    """
+
+    def __init__(self):
+        self._members = {}      # collection pointer -> {object pointer: object}
+        self._owner = {}        # object pointer -> collection pointer
+        self._scene_key = None
+        self._object_count = -1
+        self._valid = False
+
+    def invalidate(self):
+        self._valid = False
+
+    def rebuild(self):
+        scene = bpy.context.scene
+        self._members.clear()
+        self._owner.clear()
+        for obj in scene.objects:
+            collection = obj.get(Constants.OBJECT_PROP_COL)
+            if collection is not None:
+                self._add(obj, collection)
+        self._scene_key = scene.as_pointer()
+        self._object_count = len(bpy.data.objects)
+        self._valid = True
+
+    def _ensure(self):
+        # Added or removed objects (appends, deletes) change the count even without a collection update
+        if not self._valid or self._scene_key != bpy.context.scene.as_pointer() or self._object_count != len(bpy.data.objects):
+            self.rebuild()
+
+    def _add(self, obj, collection):
+        key = obj.as_pointer()
+        self._discard(key)
+        coll_key = collection.as_pointer()
+        self._members.setdefault(coll_key, {})[key] = obj
+        self._owner[key] = coll_key
+
+    def _discard(self, key):
+        coll_key = self._owner.pop(key, None)
+        if coll_key is not None:
+            self._members.get(coll_key, {}).pop(key, None)
+
+    def link(self, obj, collection):
+        if self._valid:
+            self._add(obj, collection)
+
+    def unlink(self, obj):
+        if self._valid:
+            self._discard(obj.as_pointer())
+
+    def count(self, collection):
+        if collection is None:
+            return 0
+        self._ensure()
+        return len(self._members.get(collection.as_pointer(), ()))
+
+    def members(self, collection):
+        """Linked objects of 'collection', sorted by name. Stale entries trigger a rebuild."""
+        if collection is None:
+            return []
+        self._ensure()
+        objects = list(self._members.get(collection.as_pointer(), {}).values())
+        try:
+            stale = any(obj.get(Constants.OBJECT_PROP_COL) != collection for obj in objects)
+        except ReferenceError:
+            stale = True
+        if stale:
+            self.rebuild()
+            objects = list(self._members.get(collection.as_pointer(), {}).values())
+        return sorted(objects, key=lambda obj: obj.name)
+
+
+linked_index = LinkedObjectIndex()
+
+
+# region Deferred Tags
+
+
+class TagScheduler:
+    """
+    Collects IDs that need a depsgraph update and flushes each of them once: when the
+    outermost 'deferred()' block exits (operators), on the next timer tick (update
+    callbacks), or before the next frame change at the latest (headless scripts).
+    Bulk edits thus cost one re-evaluation instead of one per touched object.
+    """
+
+    def __init__(self):
+        self._objects = {}      # object pointer -> object, gets update_tag()
+        self._data = {}         # data pointer -> mesh/curve data, gets update()
+        self._depth = 0
+        # Bound once: timers are matched by identity and every attribute access makes a new bound method
+        self._timer_fn = self._timer
+
+    @property
+    def pending(self):
+        return len(self._objects) + len(self._data)
+
+    def tag(self, id_block):
+        if id_block is None:
+            return
+        self._objects[id_block.as_pointer()] = id_block
+        self._schedule()
+
+    def tag_data(self, obj):
+        """Like obj.data.update(); meshes shared by several objects are updated once."""
+        data = getattr(obj, "data", None)
+        if data is None:
+            return
+        self._data[data.as_pointer()] = data
+        self._schedule()
+
+    def _schedule(self):
+        if self._depth == 0 and not bpy.app.timers.is_registered(self._timer_fn):
+            bpy.app.timers.register(self._timer_fn, first_interval=0.0)
+
+    def _timer(self):
+        self.flush()
+        return None
+
+    @contextmanager
+    def deferred(self):
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.flush()
+
+    def flush(self):
+        objects, data = list(self._objects.values()), list(self._data.values())
+        self._objects.clear()
+        self._data.clear()
+        for block in data:
+            try:
+                block.update()
+            except ReferenceError:
+                pass  # Removed in the meantime
+        for block in objects:
+            try:
+                block.update_tag()
+            except ReferenceError:
+                pass
+        return len(objects) + len(data)
+
+    def clear(self):
+        self._objects.clear()
+        self._data.clear()
+        if bpy.app.timers.is_registered(self._timer_fn):
+            bpy.app.timers.unregister(self._timer_fn)
+
+
+tags = TagScheduler()
+
+
+def defer_tags(cls):
+    """Wraps an operator's execute so every tag it causes is flushed once when it returns."""
+    execute = cls.execute
+    if getattr(execute, "lvcp_deferred", False):
+        return cls
+
+    @functools.wraps(execute)
+    def wrapper(self, context):
+        with tags.deferred():
+            return execute(self, context)
+
+    wrapper.lvcp_deferred = True
+    cls.execute = wrapper
+    return cls
+
+
+def lvcp_packed_driver_func(values, idx, component, owner=""):
+    """Reads one component of light 'idx' from a packed light array, so the cost does not grow with the group."""
+    i = idx * 3 + component
+    if 0 <= idx and i < len(values):
+        return values[i]
+    return 0.0
+
+def install_driver_functions():
+    bpy.app.driver_namespace[Constants.DRIVER_FUNCTION] = lvcp_driver_func
+    bpy.app.driver_namespace[Constants.DRIVER_PACKED_FUNCTION] = lvcp_packed_driver_func
+
 @persistent
 def load_post_handler(dummy):
-    bpy.app.driver_namespace[Constants.DRIVER_FUNCTION] = lvcp_driver_func
+    install_driver_functions()
+    linked_index.invalidate()
+    armature_index.invalidate()
+
+@persistent
+def load_pre_handler(dummy):
+    # IDs of the old file become invalid
+    tags.clear()
+
+@persistent
+def frame_change_pre_handler(scene, depsgraph=None):
+    # Timers do not run while a script plays frames, so pending tags are flushed here at the latest
+    if tags.pending:
+        tags.flush()
+
+@persistent
+def undo_redo_post_handler(scene, *args):
+    linked_index.invalidate()
+    armature_index.invalidate()
+
+@persistent
+def depsgraph_update_post_handler(scene, depsgraph):
+    if is_structural_update(depsgraph):
+        linked_index.invalidate()
+        armature_index.invalidate()
+    elif depsgraph.id_type_updated('ARMATURE'):
+        armature_index.invalidate()
 
 
 # region Registration
 
 
 def register():
-    bpy.app.driver_namespace[Constants.DRIVER_FUNCTION] = lvcp_driver_func
+    install_driver_functions()
 
     if load_post_handler not in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.append(load_post_handler)
+    if load_pre_handler not in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.append(load_pre_handler)
+    if frame_change_pre_handler not in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.append(frame_change_pre_handler)
+    for handler_list in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if undo_redo_post_handler not in handler_list:
+            handler_list.append(undo_redo_post_handler)
+    if depsgraph_update_post_handler not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_post_handler)
 
 
 
 def unregister():
     if load_post_handler in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.remove(load_post_handler)
-
-    if Constants.DRIVER_FUNCTION in bpy.app.driver_namespace:
-        del bpy.app.driver_namespace[Constants.DRIVER_FUNCTION]
\ No newline at end of file
+    if load_pre_handler in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.remove(load_pre_handler)
+    if frame_change_pre_handler in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(frame_change_pre_handler)
+    tags.clear()
+    for handler_list in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if undo_redo_post_handler in handler_list:
+            handler_list.remove(undo_redo_post_handler)
+    if depsgraph_update_post_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_post_handler)
+    linked_index.invalidate()
+    armature_index.invalidate()
+
+    for name in (Constants.DRIVER_FUNCTION, Constants.DRIVER_PACKED_FUNCTION):
+        if name in bpy.app.driver_namespace:
+            del bpy.app.driver_namespace[name]
\ No newline at end of file